@@ -0,0 +1,148 @@
+from typing import Optional, List, Dict, Hashable, Callable, Tuple
+
+from PySide2.QtCore import QRect, QRectF, Qt
+from PySide2.QtGui import QImage, QPainter, QPixmap
+
+import config
+
+
+class Region:
+    __slots__ = ('_atlas', '_page', '_rect')
+
+    def __init__(self, atlas: 'Atlas', page: int, rect: QRect):
+        self._atlas = atlas
+        self._page = page
+        self._rect = rect
+
+    @property
+    def page(self) -> int:
+        return self._page
+
+    @property
+    def rect(self) -> QRect:
+        return self._rect
+
+    @property
+    def pixmap(self) -> QPixmap:
+        return self._atlas.page(self._page)
+
+    def draw(self, painter: QPainter, target: QRectF):
+        painter.drawPixmap(target, self.pixmap, QRectF(self._rect))
+
+    def __repr__(self):
+        return f'Region({self._page}, {self._rect})'
+
+
+class Atlas:
+    # картинки укладываются полками в несколько больших страниц: при отрисовке через OpenGL
+    # соседние вызовы используют одну текстуру вместо переключения на каждую картинку
+    def __init__(self, page_size: int, padding: int = 1):
+        self._page_size = page_size
+        self._padding = padding
+        self._images: List[QImage] = []
+        self._pixmaps: List[Optional[QPixmap]] = []
+        self._regions: Dict[Hashable, Region] = {}
+        self._shelf_x = self._shelf_y = self._shelf_height = 0
+        self._frozen = False
+
+    @property
+    def page_size(self) -> int:
+        return self._page_size
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pixmaps)
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def get(self, key: Hashable, load: Callable[[], QImage]) -> Optional[Region]:
+        # в замороженный атлас ничего не добавляется, None - рисовать картинку отдельно
+        if (region := self._regions.get(key)) is None and not self._frozen:
+            region = self.add(key, load())
+        return region
+
+    def add(self, key: Hashable, image: QImage) -> Region:
+        if key in self._regions:
+            raise KeyError(f'{key} already in atlas')
+        if self._frozen:
+            raise ValueError(f'can not add {key} to frozen atlas')
+
+        width, height = image.width(), image.height()
+        page, x, y = self._place(width, height)
+
+        painter = QPainter(self._images[page])
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawImage(x, y, image)
+        painter.end()
+        # страница собирается заново при следующем обращении, до заморозки её никто не рисует
+        self._pixmaps[page] = None
+
+        region = self._regions[key] = Region(self, page, QRect(x, y, width, height))
+        return region
+
+    def page(self, index: int) -> QPixmap:
+        if (pixmap := self._pixmaps[index]) is None:
+            pixmap = self._pixmaps[index] = QPixmap.fromImage(self._images[index])
+        return pixmap
+
+    def freeze(self):
+        # страницы больше не меняются: каждая загружается в текстуру один раз,
+        # а исходные картинки размером в страницу освобождаются
+        for index in range(len(self._pixmaps)):
+            self.page(index)
+        self._images.clear()
+        self._frozen = True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._regions
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def _place(self, width: int, height: int) -> Tuple[int, int, int]:
+        padded_width, padded_height = width + self._padding, height + self._padding
+        if padded_width > self._page_size or padded_height > self._page_size:
+            raise ValueError(f'image {width}x{height} does not fit atlas page {self._page_size}')
+
+        if not self._images or self._shelf_x + padded_width > self._page_size:
+            # новая полка
+            self._shelf_y += self._shelf_height
+            self._shelf_x = self._shelf_height = 0
+
+        if not self._images or self._shelf_y + padded_height > self._page_size:
+            self._add_page()
+
+        x, y = self._shelf_x, self._shelf_y
+        self._shelf_x += padded_width
+        self._shelf_height = max(self._shelf_height, padded_height)
+
+        return len(self._images) - 1, x, y
+
+    def _add_page(self):
+        image = QImage(self._page_size, self._page_size, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        self._images.append(image)
+        self._pixmaps.append(None)
+        self._shelf_x = self._shelf_y = self._shelf_height = 0
+
+
+_shared: Optional[Atlas] = None
+_enabled = False
+
+
+def shared() -> Atlas:
+    global _shared
+    if _shared is None:
+        _shared = Atlas(config.ATLAS_PAGE_SIZE)
+    return _shared
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
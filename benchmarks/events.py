@@ -0,0 +1,96 @@
+import os
+import sys
+import timeit
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import Event
+
+LISTENERS = (1, 10, 100, 1000)
+NUMBER = 1000
+REPEAT = 7
+
+
+class ListEvent:
+    # прежняя реализация core.Event для сравнения
+    def __init__(self):
+        self._listeners: List[Callable] = []
+
+    def subscribe(self, listener: Callable):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable) -> bool:
+        result = True
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            result = False
+        return result
+
+    def notify(self, *args):
+        for listener in self._listeners:
+            listener(*args)
+
+
+class Listener:
+    def on_event(self, *args):
+        pass
+
+
+def prepare(event_type: type, count: int):
+    event = event_type()
+    listeners = [Listener() for _ in range(count)]
+    for listener in listeners:
+        event.subscribe(listener.on_event)
+    return event, listeners
+
+
+def bench_subscribe(event_type: type, count: int) -> float:
+    listeners = [Listener() for _ in range(count)]
+
+    def subscribe():
+        event = event_type()
+        for listener in listeners:
+            event.subscribe(listener.on_event)
+
+    return min(timeit.repeat(subscribe, number=max(1, NUMBER // count), repeat=REPEAT))
+
+
+def bench_resubscribe(event_type: type, count: int) -> float:
+    # так команды переподписываются на каждом шаге юнита
+    event, listeners = prepare(event_type, count)
+    listener = listeners[0].on_event
+
+    def resubscribe():
+        event.unsubscribe(listener)
+        event.subscribe(listener)
+
+    return min(timeit.repeat(resubscribe, number=NUMBER, repeat=REPEAT))
+
+
+def bench_notify(event_type: type, count: int) -> float:
+    event, _ = prepare(event_type, count)
+    return min(timeit.repeat(lambda: event.notify(1, 2), number=NUMBER, repeat=REPEAT))
+
+
+CASES = {
+    'subscribe': bench_subscribe,
+    'resubscribe': bench_resubscribe,
+    'notify': bench_notify,
+}
+
+
+def main(argv):
+    counts = [int(i) for i in argv[1:]] or LISTENERS
+    print(f'{"case":<12} {"listeners":>10} {"list, us":>12} {"core, us":>12} {"speedup":>8}')
+    for name, case in CASES.items():
+        for count in counts:
+            old = case(ListEvent, count) / NUMBER * 1000000
+            new = case(Event, count) / NUMBER * 1000000
+            print(f'{name:<12} {count:>10} {old:>12.3f} {new:>12.3f} {old / new:>8.2f}')
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,226 @@
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import models
+import surfaces
+from core import Coordinate, Directions, Event
+
+SIZES = (10, 100, 500, 1000, 2000)
+REPEAT = 5
+MAX_TIME = 2.0  # s, после этого повторы прекращаются, поэтому большие карты измеряются меньшее число раз
+THRESHOLD = 0.1
+MAZE_SPACING = 8
+STRUCTURE_SIDE = 3
+NOTIFY_COUNT = 100
+
+SAND = surfaces.code_of(surfaces.sand)
+ROCK = surfaces.code_of(surfaces.rock)
+
+
+def make_field(codes: np.ndarray) -> models.Field:
+    field = models.Field(1, 1)
+    field.assign(codes, list(surfaces.PALETTE))
+    return field
+
+
+def open_codes(size: int) -> np.ndarray:
+    return np.full((size, size), SAND, dtype=np.uint8)
+
+
+def maze_codes(size: int) -> np.ndarray:
+    # стены через каждые MAZE_SPACING колонок с проходом попеременно снизу и сверху
+    codes = open_codes(size)
+    for number, x in enumerate(range(MAZE_SPACING, size, MAZE_SPACING)):
+        codes[:, x] = ROCK
+        codes[size - 1 if number % 2 == 0 else 0, x] = SAND
+    return codes
+
+
+def unreachable_codes(size: int) -> np.ndarray:
+    # цель в правом нижнем углу отгорожена стеной, поиск обходит всю карту
+    codes = open_codes(size)
+    if size > 2:
+        codes[size - 2, size - 2:] = ROCK
+        codes[size - 2:, size - 2] = ROCK
+    return codes
+
+
+def timed(action: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def bench_load(size: int) -> float:
+    text = io.StringIO()
+    make_field(open_codes(size)).dump(text)
+    stream = io.StringIO(text.getvalue())
+    return timed(lambda: models.Field(1, 1).load(stream))
+
+
+def bench_dump(size: int) -> float:
+    field = make_field(open_codes(size))
+    return timed(lambda: field.dump(io.StringIO()))
+
+
+def bench_path(codes: np.ndarray) -> float:
+    size = codes.shape[0]
+    field = make_field(codes)
+    unit = models.Unit('benchmark', field, Coordinate(0, 0))
+    return timed(lambda: unit.generate_path(Coordinate(size - 1, size - 1)))
+
+
+def bench_passable(size: int) -> float:
+    field = make_field(open_codes(size))
+
+    def scan():
+        for y in range(size):
+            for x in range(size):
+                field.at(x, y).passable
+
+    return timed(scan)
+
+
+def bench_structure_place(size: int) -> float:
+    field = make_field(np.full((size, size), ROCK, dtype=np.uint8))
+    shape = [Coordinate(x, y) for y in range(STRUCTURE_SIDE) for x in range(STRUCTURE_SIDE)]
+    positions = [Coordinate(x, y)
+                 for y in range(0, size - STRUCTURE_SIDE + 1, STRUCTURE_SIDE)
+                 for x in range(0, size - STRUCTURE_SIDE + 1, STRUCTURE_SIDE)]
+    structures = [models.Structure('benchmark', shape, False) for _ in positions]
+
+    def place():
+        for structure, position in zip(structures, positions):
+            structure.place(field, position, Directions.east)
+
+    return timed(place)
+
+
+def bench_structure_anchors(size: int) -> float:
+    field = make_field(np.full((size, size), ROCK, dtype=np.uint8))
+    shape = [Coordinate(x, y) for y in range(STRUCTURE_SIDE) for x in range(STRUCTURE_SIDE)]
+    return timed(lambda: models.Structure('benchmark', shape, False).anchors(field))
+
+
+def bench_notify(size: int) -> float:
+    # число подписчиков равно стороне карты
+    event = Event()
+    for _ in range(size):
+        event.subscribe(lambda *args: None)
+
+    def notify():
+        for _ in range(NOTIFY_COUNT):
+            event.notify(1, 2)
+
+    return timed(notify)
+
+
+CASES: Dict[str, Callable[[int], float]] = {
+    'field.load': bench_load,
+    'field.dump': bench_dump,
+    'unit.generate_path.open': lambda size: bench_path(open_codes(size)),
+    'unit.generate_path.maze': lambda size: bench_path(maze_codes(size)),
+    'unit.generate_path.unreachable': lambda size: bench_path(unreachable_codes(size)),
+    'cell.passable.scan': bench_passable,
+    'structure.place': bench_structure_place,
+    'structure.anchors': bench_structure_anchors,
+    'event.notify.fan_out': bench_notify,
+}
+
+
+def measure(case: Callable[[int], float], size: int, repeat: int) -> List[float]:
+    times = []
+    while len(times) < repeat:
+        times.append(case(size))
+        if sum(times) >= MAX_TIME:
+            break
+    return times
+
+
+def run(sizes: List[int], names: List[str], repeat: int) -> dict:
+    results = []
+    for name in names:
+        for size in sizes:
+            times = measure(CASES[name], size, repeat)
+            result = {'case': name, 'size': size, 'repeat': len(times),
+                      'min': min(times), 'median': statistics.median(times), 'mean': statistics.mean(times)}
+            results.append(result)
+            print(f'{name:<32} {f"{size}x{size}":>10} {result["min"] * 1000:>12.3f} ms', flush=True)
+
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[Tuple[str, int, float]]:
+    # сравнивается минимум: он меньше всего зависит от фоновой нагрузки
+    previous = {(result['case'], result['size']): result['min'] for result in baseline['results']}
+    regressions = []
+    print(f'{"case":<32} {"size":>10} {"baseline, ms":>14} {"current, ms":>14} {"ratio":>8}')
+    for result in current['results']:
+        key = (result['case'], result['size'])
+        if key not in previous:
+            continue
+
+        ratio = result['min'] / previous[key] if previous[key] else float('inf')
+        mark = ' regression' if ratio > 1 + threshold else ''
+        if mark:
+            regressions.append((*key, ratio))
+        print(f'{key[0]:<32} {f"{key[1]}x{key[1]}":>10} {previous[key] * 1000:>14.3f} '
+              f'{result["min"] * 1000:>14.3f} {ratio:>8.2f}{mark}')
+
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='model hot path benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    run_parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    run_parser.add_argument('--repeat', type=int, default=REPEAT)
+    run_parser.add_argument('--output', '-o')
+
+    compare_parser = subparsers.add_parser('compare')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=THRESHOLD)
+
+    args = parser.parse_args(argv[1:])
+    if args.command == 'run':
+        report = run(args.sizes, args.cases, args.repeat)
+        if args.output:
+            with open(args.output, 'w') as fo:
+                json.dump(report, fo, indent=2)
+        return 0
+
+    with open(args.baseline) as fo:
+        baseline = json.load(fo)
+    with open(args.current) as fo:
+        current = json.load(fo)
+
+    regressions = compare(baseline, current, args.threshold)
+    for name, size, ratio in regressions:
+        print(f'{name} {size}x{size} is {ratio:.2f}x slower')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,35 @@
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models
+
+SIZES = (100, 1000, 4000)
+MEGABYTE = 1024 * 1024
+
+
+def measure(size: int):
+    tracemalloc.start()
+    field = models.Field(size, size)
+    # клетки создаются по запросу и не должны оставаться в памяти
+    for x in range(min(size, 1000)):
+        field.at(x, x).surface
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return current, peak
+
+
+def main(argv):
+    sizes = [int(i) for i in argv[1:]] or SIZES
+    print(f'{"size":>12} {"current, MB":>12} {"peak, MB":>12} {"bytes/cell":>12}')
+    for size in sizes:
+        current, peak = measure(size)
+        print(f'{f"{size}x{size}":>12} {current / MEGABYTE:>12.1f} {peak / MEGABYTE:>12.1f} '
+              f'{current / (size * size):>12.1f}')
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,123 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(sys.path[0])
+
+from PySide2.QtGui import QPainterPath
+from PySide2.QtWidgets import QApplication, QGraphicsView
+
+import graphics
+import models
+import views
+
+FRAMES = 300
+SIZE = 800
+# клетки мельче игровых, чтобы карта целиком помещалась во вьюпорт
+SQUARE_SIZE = 48
+MAP = 'maps/test2.txt'
+ROUTE_LENGTH = 6
+# предел обработок событий в ожидании отрисовки кадра
+MAX_EVENT_PASSES = 1000
+
+
+def with_mode(base: type, mode: QGraphicsView.ViewportUpdateMode) -> type:
+    class View(graphics.AdaptiveUpdateGraphicsView, base):
+        def __init__(self):
+            super().__init__()
+            self.setViewportUpdateMode(mode)
+
+    return View
+
+
+# QGLWidget встраивается только в оконную систему с дочерними GL-окнами, на eglfs его не создать;
+# растровые вьюпорты для сравнения: только они получают от Qt 5 частичные обновления
+VIEWS = {
+    'qglwidget': with_mode(graphics.OGLGraphicsView, QGraphicsView.FullViewportUpdate),
+    'qopenglwidget': with_mode(graphics.OpenGLGraphicsView, QGraphicsView.FullViewportUpdate),
+    'qopenglwidget-smart': with_mode(graphics.OpenGLGraphicsView, QGraphicsView.SmartViewportUpdate),
+    'raster': with_mode(QGraphicsView, QGraphicsView.FullViewportUpdate),
+    'raster-smart': with_mode(QGraphicsView, QGraphicsView.SmartViewportUpdate),
+}
+
+
+def route(offset: int) -> QPainterPath:
+    # маршрут длиной в несколько клеток, каждый кадр сдвигается на клетку
+    path = QPainterPath()
+    path.moveTo(offset * SQUARE_SIZE + SQUARE_SIZE / 2, SQUARE_SIZE / 2)
+    path.lineTo((offset + ROUTE_LENGTH) * SQUARE_SIZE + SQUARE_SIZE / 2, SQUARE_SIZE / 2)
+    return path
+
+
+def wait_paint(application: QApplication, view: graphics.AdaptiveUpdateGraphicsView, painted: int):
+    # кадр считается, когда вьюпорт его действительно нарисовал
+    for _ in range(MAX_EVENT_PASSES):
+        if len(view.telemetry) > painted:
+            return
+        application.processEvents()
+    raise RuntimeError('viewport did not repaint')
+
+
+def measure(application: QApplication, view_type: type, frames: int) -> Tuple[str, graphics.FrameTelemetry]:
+    field = models.Field(1, 1)
+    with open(MAP) as fo:
+        field.load(fo)
+
+    scene = views.Field(field, None, SQUARE_SIZE)
+    view = view_type()
+    # режим обновления остаётся тем, что задан для варианта вьюпорта
+    view.set_adaptive_update(False)
+    view.setScene(scene)
+    view.resize(SIZE, SIZE)
+    view.show()
+    view.centerOn(0, 0)
+
+    item = views.RoutePath(route(0))
+    scene.add_unit_path(item)
+    for _ in range(10):
+        application.processEvents()
+
+    # маршрут ходит только по видимым клеткам, иначе часть кадров ничего не перерисовывает
+    visible = view.mapToScene(view.viewport().rect()).boundingRect().intersected(scene.sceneRect())
+    span = max(2, int(visible.width()) // SQUARE_SIZE - ROUTE_LENGTH)
+    view.telemetry = graphics.FrameTelemetry(frames)
+    for frame in range(frames):
+        # вьюпорт перерисовывает то, что пометила сцена, в выбранном режиме обновления
+        item.setPath(route((frame + 1) % span))
+        wait_paint(application, view, frame)
+
+    mode = view.MODE_NAMES.get(view.viewportUpdateMode(), 'other')
+    view.close()
+    return mode, view.telemetry
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='viewport paint time while a route changes every frame')
+    parser.add_argument('--views', nargs='+', choices=VIEWS, default=list(VIEWS))
+    parser.add_argument('--frames', type=int, default=FRAMES)
+    parser.add_argument('--no-header', action='store_true')
+    args = parser.parse_args(argv[1:])
+
+    if not args.no_header:
+        print(f'{"viewport":<20} {"update":>14} {"paint, ms":>10} {"max, ms":>10}', flush=True)
+
+    if len(args.views) > 1:
+        # каждый вьюпорт в отдельном процессе: прогретые кэши не достаются следующему,
+        # а eglfs не создаёт второе GL-окно в том же процессе
+        for name in args.views:
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--views', name,
+                            '--frames', str(args.frames), '--no-header'])
+        return 0
+
+    name, = args.views
+    application = QApplication(argv)
+    mode, telemetry = measure(application, VIEWS[name], args.frames)
+    print(f'{name:<20} {mode:>14} {telemetry.paint_time:>10.3f} {telemetry.max_paint_time:>10.3f}', flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,103 @@
+import argparse
+import io
+import mmap
+import struct
+import sys
+from typing import List, BinaryIO
+
+import numpy as np
+
+import config
+import models
+import surfaces
+
+MAGIC = b'RMAP'
+VERSION = 1
+ALIGNMENT = 8
+
+# magic, версия, размер кода клетки в байтах, ширина, высота, размер палитры
+HEADER = struct.Struct('<4sHHIIH')
+NAME_LENGTH = struct.Struct('<B')
+
+# коды клеток - индексы палитры из не более чем 256 поверхностей
+CODE_TYPE = np.uint8
+
+
+def dump(field: models.Field, stream: BinaryIO):
+    palette = [config.SURFACE_NAME_TEMPLATE.format(i.name, i.id).encode() for i in surfaces.PALETTE]
+    codes = field.surface_codes
+
+    header = io.BytesIO()
+    header.write(HEADER.pack(MAGIC, VERSION, np.dtype(CODE_TYPE).itemsize, field.width, field.height, len(palette)))
+    for name in palette:
+        header.write(NAME_LENGTH.pack(len(name)))
+        header.write(name)
+    # сетка выравнивается, чтобы её можно было читать из отображённого файла напрямую
+    header.write(bytes(-header.tell() % ALIGNMENT))
+
+    stream.write(header.getvalue())
+    stream.write(np.ascontiguousarray(codes, dtype=CODE_TYPE).tobytes())
+
+
+def load(path: str) -> models.Field:
+    with open(path, 'rb') as fo:
+        # копирование при записи: поле можно менять, файл на диске остаётся прежним
+        buffer = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    magic, version, code_size, width, height, palette_size = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f'"{path}" is not a binary map')
+    if version != VERSION:
+        raise ValueError(f'unsupported binary map version: {version}')
+    if code_size != np.dtype(CODE_TYPE).itemsize:
+        raise ValueError(f'unsupported surface code size: {code_size}')
+    if palette_size > np.iinfo(CODE_TYPE).max + 1:
+        raise ValueError(f'too many surfaces: {palette_size}')
+
+    offset = HEADER.size
+    palette: List[surfaces.Surface] = []
+    for _ in range(palette_size):
+        length, = NAME_LENGTH.unpack_from(buffer, offset)
+        offset += NAME_LENGTH.size
+        palette.append(surfaces.from_name(buffer[offset:offset + length].decode()))
+        offset += length
+    offset += -offset % ALIGNMENT
+
+    # сетка не копируется: поле работает прямо с отображённым файлом
+    codes = np.frombuffer(buffer, dtype=CODE_TYPE, count=width * height, offset=offset).reshape(height, width)
+
+    field = models.Field(0, 0)
+    field.assign(codes, palette)
+    return field
+
+
+def text_to_binary(source: str, destination: str):
+    field = models.Field(0, 0)
+    with open(source, 'r') as fo:
+        field.load(fo)
+
+    with open(destination, 'wb') as fo:
+        dump(field, fo)
+
+
+def binary_to_text(source: str, destination: str):
+    field = load(source)
+    with open(destination, 'w') as fo:
+        field.dump(fo)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='binary map converter')
+    parser.add_argument('command', choices=('to-binary', 'to-text'))
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    args = parser.parse_args(argv[1:])
+
+    if args.command == 'to-binary':
+        text_to_binary(args.source, args.destination)
+    else:
+        binary_to_text(args.source, args.destination)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
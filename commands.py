@@ -1,9 +1,12 @@
 import contextlib
+from collections import deque
 from abc import ABC, abstractmethod
-from typing import Optional, List, Callable, Any
+from typing import Optional, List, Callable, Any, Deque
 
+import config
+import cooperative
 import models
-from core import Coordinate, Event
+from core import Coordinate, Directions, Event
 
 
 class Command(ABC):
@@ -93,11 +96,19 @@ class Waitable(Command):
 
 class UnitMove(Command):
     finished = None  # ()
-
-    def __init__(self, unit: models.Unit, destination: Coordinate, animation_ended: Event):
-        self._animation_ended = animation_ended
+    failed = None  # ()
+
+    def __init__(self, unit: models.Unit, destination: Coordinate, action_ended: Event,
+                 planner: Optional[cooperative.Planner] = None):
+        self._action_ended = action_ended
+        self._route: Deque[Directions] = deque()
+        self._steps: Deque[cooperative.Step] = deque()
+        self._tail: List[Directions] = []
+        self._executed = 0
+        self._planner = planner
         self._destination = destination
         self.finished = Event()
+        self.failed = Event()
         self._interrupt = False
         self._subscribed = False
         self._unit = unit
@@ -107,34 +118,98 @@ class UnitMove(Command):
 
     def execute(self):
         if self._subscribed:
-            self._animation_ended.unsubscribe(self.execute)
+            self._action_ended.unsubscribe(self.execute)
             self._subscribed = False
 
         if self._interrupt or self._unit.position.equals(self._destination):
             self._interrupt = False
             self.finish()
 
-        elif path := self._unit.generate_path(self._destination):
+        elif self._planner:
+            self._execute_planned()
+
+        elif route := self._get_route():
             prev_direction = self._unit.direction
-            new_direction = path[0]
+            new_direction = route[0]
 
             if prev_direction != new_direction:
                 self._unit.turn(new_direction)
-                self._animation_ended.subscribe(self.execute)
+                self._action_ended.subscribe(self.execute)
                 self._subscribed = True
 
             elif self._unit.move(new_direction):
-                self._animation_ended.subscribe(self.execute)
+                route.popleft()
+                self._unit.route_calculated.notify(self._unit.position, self._destination, route)
+                self._action_ended.subscribe(self.execute)
                 self._subscribed = True
             else:
-                self.finish()
+                self._fail()
         else:
-            self.finish()
+            self._fail()
+
+    def _fail(self):
+        self.failed.notify()
+        self.finish()
 
     def finish(self):
+        self._route.clear()
+        self._steps.clear()
+        if self._planner:
+            self._planner.park(self._unit)
         self._unit.path_completed.notify()
         self.finished.notify()
 
+    def _execute_planned(self):
+        # юнит идёт по забронированным шагам; если шаг всё же занят, он ждёт и строит план заново.
+        # планировщик отказывает, если цель недостижима или юнит слишком долго к ней не приближается
+        if not self._steps or self._executed >= config.COOPERATIVE_REPLAN_STEPS:
+            if (plan := self._planner.plan(self._unit, self._destination)) is None:
+                self._fail()
+                return
+
+            self._steps, self._tail = deque(plan[0]), plan[1]
+            self._executed = 0
+            if not self._steps:
+                self.finish()
+                return
+            self._notify_route()
+
+        step = self._steps[0]
+        if step is None:
+            self._steps.popleft()
+            self._executed += 1
+            self._planner.wait(self._unit)
+
+        elif self._unit.direction != step:
+            self._unit.turn(step)
+
+        elif self._unit.field.at_point(self._unit.position + step.value).passable:
+            self._unit.move(step)
+            self._steps.popleft()
+            self._executed += 1
+            self._notify_route()
+        else:
+            self._steps.clear()
+            self._planner.wait(self._unit)
+
+        self._action_ended.subscribe(self.execute)
+        self._subscribed = True
+
+    def _notify_route(self):
+        route = [step for step in self._steps if step is not None] + self._tail
+        self._unit.route_calculated.notify(self._unit.position, self._destination, route)
+
+    def _get_route(self) -> Deque[Directions]:
+        # маршрут перестраивается, только если следующая клетка стала непроходимой
+        if self._route:
+            next_position = self._unit.position + self._route[0].value
+            cell = self._unit.field.at_point(next_position)
+            if cell and (cell.passable or next_position.equals(self._destination)):
+                return self._route
+
+        self._route = deque(self._unit.generate_path(self._destination) or ())
+        return self._route
+
     def __repr__(self):
         return f'UnitMoveCommand({self._unit}({self._destination})'
 
@@ -6,6 +6,7 @@ import os
 DEFAULT_SQUARE_SIZE = 200
 DEFAULT_ANIMATION_SPEED = 24  # frames per second
 DEFAULT_MOVE_ANIMATION_SPEED = 1000  # ms
+DEFAULT_TURN_ANIMATION_SPEED = 300  # ms
 TILES_PATH = os.path.join(os.path.abspath(os.path.curdir), 'resource/tiles')
 SPRITES_PATH = 'resource/sprites'
 OVERLAYS_PATH = 'resource/overlays'
@@ -16,3 +17,32 @@ SPACE_LITERAL = ' '
 MAIN_VIEW_INDEX = 0
 SURFACE_NAME_TEMPLATE = '{}-{:0>3}'
 SURFACE_NAME_DELIMITER = '-'
+BINARY_MAP_EXTENSION = '.rmap'
+TILE_CACHE_SIZE = 256
+SPRITE_SHEET_CACHE_SIZE = 128
+ANIMATION_CLOCK_INTERVAL = 10  # ms
+TERRAIN_CHUNK_CELLS = 16
+TERRAIN_CACHE_LIMIT = 256 * 1024  # KB
+VIEWPORT_MARGIN_CHUNKS = 1
+LOD_SCALES = (1.0, 0.5, 0.25)  # уровни детализации тайлов и спрайтов, от крупного к мелкому
+RASTER_CACHE_PATH = os.path.join(os.path.abspath(os.path.curdir), 'cache', 'raster')
+USE_TEXTURE_ATLAS = True  # только для OpenGL-вьюпорта
+ATLAS_PAGE_SIZE = 4096
+USE_OPENGL_VIEWPORT = True  # False - растровый вьюпорт с частичными обновлениями (benchmarks/viewport.py)
+USE_QOPENGLWIDGET = True  # False - устаревший QGLWidget; оба OpenGL-вьюпорта перерисовываются целиком
+SHOW_FRAME_TELEMETRY = False
+FRAME_TELEMETRY_WINDOW = 120  # кадров
+FRAME_TELEMETRY_INTERVAL = 500  # ms
+FRAME_IDLE_THRESHOLD = 250  # ms
+TELEMETRY_MARGIN = 4  # px
+SMART_UPDATE_MAX_ANIMATIONS = 16
+BOUNDING_RECT_UPDATE_MAX_ANIMATIONS = 128
+SIMULATION_TICK = 10  # ms
+UNIT_INDEX_BUCKET_CELLS = 16
+COOPERATIVE_WINDOW = 16  # действий, бронируемых за одно планирование
+COOPERATIVE_REPLAN_STEPS = 8  # через сколько действий план строится заново
+COOPERATIVE_MAX_EXPANSIONS = 1000
+COOPERATIVE_STALL_CHECK = 10000  # ms без приближения к цели, после которых проверяется, можно ли подойти ближе
+COOPERATIVE_STALL_CHECK_CELLS = 1024  # предел обхода при этой проверке
+COOPERATIVE_MAX_STALL = 120000  # ms без приближения к цели, после которых юнит отказывается от приказа
+COOPERATIVE_FLOW_FIELD_CACHE_SIZE = 16
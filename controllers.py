@@ -1,14 +1,19 @@
 from typing import Optional, Iterable, List
 
 import commands
+import cooperative
 import models
+import simulation
 import views
 from core import Coordinate
 
 
 class Unit:
-    def __init__(self, model: models.Unit):
+    def __init__(self, model: models.Unit, simulation_: simulation.Simulation,
+                 planner: Optional[cooperative.Planner] = None):
         self._command_chain = commands.Chain()
+        self._action_ended = simulation_.track(model)
+        self._planner = planner
         self.view: Optional[views.Unit] = None
         self.model = model
 
@@ -16,7 +21,7 @@ class Unit:
         self.view = view
 
     def move(self, position: Coordinate, interrupt: bool = True):
-        self._execute_commands([commands.UnitMove(self.model, position, self.view.animation_ended)], interrupt)
+        self._execute_commands([commands.UnitMove(self.model, position, self._action_ended, self._planner)], interrupt)
 
     def _execute_commands(self, command_list: Iterable, interrupt_next_commands: bool = True):
         if self._command_chain.is_running() and interrupt_next_commands:
@@ -31,9 +36,11 @@ class Unit:
 
 
 class Field:
-    def __init__(self, model: models.Field):
+    def __init__(self, model: models.Field, simulation_: simulation.Simulation):
         self._active_units: List[views.Unit] = []
         self.view: Optional[views.Field] = None
+        self.simulation = simulation_
+        self.planner = cooperative.Planner(model, simulation_)
         self.model = model
 
     def set_view(self, view: views.Field):
@@ -43,7 +50,7 @@ class Field:
         self.view = view
 
     def add_unit(self, model: models.Unit, resource: str):
-        controller = Unit(model)
+        controller = Unit(model, self.simulation, self.planner)
         view = views.Unit(model, resource, controller, self.view.elements_size)
         controller.set_view(view)
         self.view.add_unit(view)
@@ -57,6 +64,8 @@ class Field:
     def clear_active_units(self):
         self._active_units = []
 
-    def activate_cell(self, cell: views.Cell):
+    def activate_cell(self, cell: models.Cell):
+        # группа тоже идёт через планировщик: юниты бронируют клетки друг от друга,
+        # а поле расстояний до цели у планировщика одно на всю группу
         for unit in self.get_active_units():
-            unit.controller.move(cell.model.position)
+            unit.controller.move(cell.position)
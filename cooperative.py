@@ -0,0 +1,240 @@
+import heapq
+import itertools
+from collections import OrderedDict, deque
+from typing import Optional, List, Dict, Tuple
+
+import config
+import models
+import pathfinding
+import simulation
+from core import Coordinate, Directions
+
+# шаг плана: направление движения или None - ожидание на месте
+Step = Optional[Directions]
+
+
+class Planner:
+    def __init__(self, field: models.Field, simulation_: simulation.Simulation,
+                 window: int = config.COOPERATIVE_WINDOW, max_expansions: int = config.COOPERATIVE_MAX_EXPANSIONS,
+                 stall_check: int = config.COOPERATIVE_STALL_CHECK, max_stall: int = config.COOPERATIVE_MAX_STALL):
+        self._field = field
+        self._simulation = simulation_
+        self._window = window
+        self._max_expansions = max_expansions
+        self._stall_check_ticks = simulation_.ticks(stall_check)
+        self._max_stall_ticks = simulation_.ticks(max_stall)
+        # расстояния до цели без учёта юнитов, общие для всех юнитов с одной целью
+        self._flow_fields: Dict[Tuple[int, int], pathfinding.FlowField] = OrderedDict()
+        # юнит -> (цель, наименьшее расстояние до неё, такт, когда оно было достигнуто)
+        self._progress: Dict[models.Unit, Tuple[Coordinate, int, int]] = {}
+        field.changed.subscribe(self._on_field_changed)
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    def wait(self, unit: models.Unit):
+        self._simulation.wait(unit, self._wait_ticks(unit))
+
+    def release(self, unit: models.Unit):
+        self._progress.pop(unit, None)
+        self._field.reservations.release(unit)
+
+    def park(self, unit: models.Unit):
+        # остановившийся юнит занимает клетку, пока не получит новый приказ
+        self._progress.pop(unit, None)
+        self._field.reservations.park(unit, unit.x, unit.y, self._simulation.tick)
+
+    def plan(self, unit: models.Unit, destination: Coordinate) -> Optional[Tuple[List[Step], List[Directions]]]:
+        # оконный кооперативный A*: первые window действий ищутся в пространстве-времени с учётом
+        # броней других юнитов и бронируются, дальше маршрут берётся из поля расстояний до цели.
+        # None - цель недостижима или юнит слишком долго не может к ней приблизиться
+        field = self._field
+        table = field.reservations
+        table.release(unit)
+
+        flow_field = self._flow_field(destination)
+        if flow_field.distance(unit.position) is None or self._stalled(unit, destination, flow_field):
+            return None
+
+        distances = flow_field.distances
+
+        def distance(x: int, y: int) -> int:
+            return distances.item(y, x)
+
+        # если цель и клетки вокруг заняты стоящими юнитами, целью становится ближайшая свободная клетка
+        reachable = self._free_distance(unit, destination)
+
+        def is_goal(x: int, y: int) -> bool:
+            return distance(x, y) <= reachable
+
+        def remaining(x: int, y: int) -> int:
+            return max(0, distance(x, y) - reachable)
+
+        traversability = field.traversability
+        timings: Dict[models.Speed, Tuple[int, int]] = {}
+
+        def timing(x: int, y: int) -> Tuple[int, int]:
+            # (поворот, шаг) в тактах по скорости юнита на этой клетке: столько же длится
+            # ожидание на ней и шаг в неё с соседней клетки
+            speed = unit.speed if x == unit.x and y == unit.y else unit.speed_on(field.surface_at(x, y))
+            if (result := timings.get(speed)) is None:
+                result = timings[speed] = (self._simulation.ticks(simulation.turn_duration(unit, speed)),
+                                           self._simulation.ticks(simulation.move_duration(unit, speed)))
+            return result
+
+        # оценка в тактах по текущей скорости; при равной оценке раскрываются узлы ближе к цели
+        estimate = self._wait_ticks(unit)
+        now = self._simulation.tick
+        start = unit.position
+        # узел: (x, y, направление, такт, глубина, родитель, действие, начало поворота)
+        nodes = [(start.x, start.y, unit.direction, now, 0, -1, None, now)]
+        order = itertools.count()
+        queue = [(remaining(start.x, start.y) * estimate + now, remaining(start.x, start.y), next(order), 0)]
+        closed = set()
+        best = 0
+        found = None
+
+        while queue and len(closed) < self._max_expansions:
+            _, _, _, index = heapq.heappop(queue)
+            x, y, direction, tick, depth, _, _, _ = nodes[index]
+            if is_goal(x, y) or depth >= self._window:
+                found = index
+                break
+
+            if (x, y, direction, tick) in closed:
+                continue
+            closed.add((x, y, direction, tick))
+            if (distance(x, y), tick) < (distance(nodes[best][0], nodes[best][1]), nodes[best][3]):
+                best = index
+
+            turn_ticks, wait_ticks = timing(x, y)
+            if table.is_free(x, y, tick, tick + wait_ticks, unit):
+                nodes.append((x, y, direction, tick + wait_ticks, depth + 1, index, None, tick))
+                left = remaining(x, y)
+                heapq.heappush(queue, (tick + wait_ticks + left * estimate, left, next(order), len(nodes) - 1))
+
+            for step, dx, dy in pathfinding.STEPS:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < field.width and 0 <= ny < field.height):
+                    continue
+                if not traversability.item(ny, nx) or self._is_held(unit, nx, ny):
+                    continue
+
+                moved = tick + (turn_ticks if step != direction else 0)
+                end = moved + timing(nx, ny)[1]
+                if table.is_free(x, y, tick, end, unit) and table.is_free(nx, ny, moved, end, unit):
+                    nodes.append((nx, ny, step, end, depth + 1, index, step, moved))
+                    left = remaining(nx, ny)
+                    heapq.heappush(queue, (end + left * estimate, left, next(order), len(nodes) - 1))
+
+        if found is None:
+            found = best
+
+        last = nodes[found]
+        steps = self._reserve(unit, nodes, found, timing(last[0], last[1])[1])
+        if found == best and not steps and not is_goal(start.x, start.y):
+            # обойти соседей не удалось даже ожиданием: ждём и планируем заново
+            steps = [None]
+
+        tail = flow_field.route(Coordinate(last[0], last[1])) or []
+        return steps, tail[:remaining(last[0], last[1])]
+
+    def _reserve(self, unit: models.Unit, nodes: list, index: int, wait_ticks: int) -> List[Step]:
+        table = self._field.reservations
+        x, y, _, tick, _, _, _, _ = nodes[index]
+        # конечная клетка окна остаётся за юнитом до следующего планирования
+        table.reserve(unit, x, y, tick, tick + self._window * wait_ticks)
+
+        steps = []
+        while (parent := nodes[index][5]) >= 0:
+            x, y, _, end, _, _, step, moved = nodes[index]
+            px, py, _, start, _, _, _, _ = nodes[parent]
+            table.reserve(unit, px, py, start, end)
+            if step is not None:
+                table.reserve(unit, x, y, moved, end)
+            steps.append(step)
+            index = parent
+
+        steps.reverse()
+        return steps
+
+    def _stalled(self, unit: models.Unit, destination: Coordinate, flow_field: pathfinding.FlowField) -> bool:
+        # юнит, который долго не приближается к цели, отказывается от приказа вместо бесконечных перепланирований:
+        # сразу, если стоящие юниты отрезали его от клеток ближе к цели, и в любом случае после max_stall
+        distance = flow_field.distance(unit.position)
+        now = self._simulation.tick
+        target, closest, since = self._progress.get(unit, (None, None, now))
+        if target is None or not target.equals(destination) or distance < closest:
+            self._progress[unit] = (destination, distance, now)
+            return False
+
+        stalled = now - since
+        if stalled > self._max_stall_ticks:
+            return True
+        return stalled > self._stall_check_ticks and not self._can_approach(unit, closest, flow_field)
+
+    def _can_approach(self, unit: models.Unit, closest: int, flow_field: pathfinding.FlowField) -> bool:
+        # обход в ширину от юнита в обход стоящих юнитов; если обход упёрся в предел, ответа нет и юнит ждёт дальше
+        field = self._field
+        traversability = field.traversability
+        distances = flow_field.distances
+        visited = {(unit.x, unit.y)}
+        wave = deque([(unit.x, unit.y)])
+        while wave:
+            x, y = wave.popleft()
+            if distances.item(y, x) < closest or len(visited) >= config.COOPERATIVE_STALL_CHECK_CELLS:
+                return True
+
+            for _, dx, dy in pathfinding.STEPS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < field.width and 0 <= ny < field.height and (nx, ny) not in visited \
+                        and traversability.item(ny, nx) and not self._is_held(unit, nx, ny):
+                    visited.add((nx, ny))
+                    wave.append((nx, ny))
+        return False
+
+    def _free_distance(self, unit: models.Unit, destination: Coordinate) -> int:
+        # расстояние от цели до ближайшей проходимой клетки, не занятой стоящим юнитом; обход в ширину от цели
+        field = self._field
+        traversability = field.traversability
+        visited = {(destination.x, destination.y)}
+        wave = deque([(destination.x, destination.y, 0)])
+        while wave:
+            x, y, distance = wave.popleft()
+            if traversability.item(y, x) and not self._is_held(unit, x, y):
+                return distance
+
+            for _, dx, dy in pathfinding.STEPS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < field.width and 0 <= ny < field.height and (nx, ny) not in visited \
+                        and traversability.item(ny, nx):
+                    visited.add((nx, ny))
+                    wave.append((nx, ny, distance + 1))
+        return 0
+
+    def _is_held(self, unit: models.Unit, x: int, y: int) -> bool:
+        # юнит без брони или остановившийся юнит стоит на месте и для планировщика является препятствием
+        other = self._field.units.get(x, y)
+        reservations = self._field.reservations
+        return other is not None and other is not unit and (other not in reservations
+                                                            or reservations.is_parked(other))
+
+    def _wait_ticks(self, unit: models.Unit) -> int:
+        return self._simulation.ticks(simulation.move_duration(unit))
+
+    def _flow_field(self, destination: Coordinate) -> pathfinding.FlowField:
+        # поле строится на всю карту, поэтому хранятся только поля недавних целей
+        key = (destination.x, destination.y)
+        if (flow_field := self._flow_fields.get(key)) is not None:
+            self._flow_fields.move_to_end(key)
+        else:
+            flow_field = self._flow_fields[key] = pathfinding.FlowField(destination, self._field.traversability)
+            if len(self._flow_fields) > config.COOPERATIVE_FLOW_FIELD_CACHE_SIZE:
+                self._flow_fields.popitem(last=False)
+        return flow_field
+
+    def _on_field_changed(self, diff: models.FieldDiff):
+        # проходимость без учёта юнитов меняют только поверхность и строения
+        if diff.surfaces or any(name == 'structures' for name, _, _, _ in diff.placed + diff.removed):
+            self._flow_fields.clear()
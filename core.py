@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import weakref
 from enum import Enum
-from typing import Any, Hashable, Optional, Callable, List, Generic, TypeVar
+from typing import Any, Hashable, Optional, Callable, List, Generic, TypeVar, Dict, Tuple
 
 from PySide2.QtCore import QObject, Signal
 
@@ -67,26 +68,113 @@ class UnitState(Enum):
         return self.name
 
 
+def _listener_key(listener: Callable) -> Hashable:
+    # связанный метод создаётся заново при каждом обращении, поэтому ключом служат объект и функция;
+    # у встроенных методов (list.append) нет __func__, они сравниваются по объекту и имени сами
+    try:
+        return id(listener.__self__), listener.__func__
+    except AttributeError:
+        return listener if hasattr(listener, '__self__') else id(listener)
+
+
 class Event:
-    def __init__(self):
-        self._listeners: List[Callable] = []
+    def __init__(self, deferred: bool = False, coalesce: bool = True):
+        self._listeners: Dict[Hashable, Callable] = {}
+        # кортеж слушателей для рассылки, пересобирается после подписки или отписки
+        self._snapshot: Optional[Tuple[Callable, ...]] = ()
+        # отложенное событие рассылается в dispatch_deferred, одинаковые вызовы за такт схлопываются в последний
+        self._deferred = deferred
+        self._coalesce = coalesce
+        self._pending: List[tuple] = []
+        if deferred:
+            self.notify = self._defer
+
+    @property
+    def deferred(self) -> bool:
+        return self._deferred
 
-    def subscribe(self, listener: Callable):
-        if listener not in self._listeners:
-            self._listeners.append(listener)
+    def subscribe(self, listener: Callable, weak: bool = False):
+        try:
+            key = id(listener.__self__), listener.__func__
+        except AttributeError:
+            key = _listener_key(listener)
+        if key in self._listeners:
+            return
+
+        if weak:
+            self._listeners[key] = self._weak_caller(key, listener)
+        else:
+            self._listeners[key] = listener
+        self._snapshot = None
 
     def unsubscribe(self, listener: Callable) -> bool:
-        result = True
+        # переподписка идёт на каждом шаге юнита, поэтому частый случай связанного метода разобран на месте
         try:
-            self._listeners.remove(listener)
-        except ValueError:
-            result = False
-        return result
+            key = id(listener.__self__), listener.__func__
+        except AttributeError:
+            key = _listener_key(listener)
+        if self._listeners.pop(key, None) is None:
+            return False
+        self._snapshot = None
+        return True
 
     def notify(self, *args):
-        for listener in self._listeners:
+        for listener in self._snapshot or self._listeners_snapshot():
             listener(*args)
 
+    def cancel(self):
+        self._pending = []
+
+    def dispatch(self):
+        pending, self._pending = self._pending, []
+        snapshot = self._snapshot or self._listeners_snapshot()
+        for args in pending:
+            for listener in snapshot:
+                listener(*args)
+
+    @property
+    def listener_count(self) -> int:
+        return len(self._listeners)
+
+    def _listeners_snapshot(self) -> Tuple[Callable, ...]:
+        self._snapshot = tuple(self._listeners.values())
+        return self._snapshot
+
+    def _defer(self, *args):
+        if self._coalesce:
+            self._pending[:] = [args]
+        else:
+            self._pending.append(args)
+        _pending_events[self] = None
+
+    def _weak_caller(self, key: Hashable, listener: Callable) -> Callable:
+        def forget(_):
+            if self._listeners.get(key) is caller:
+                del self._listeners[key]
+                self._snapshot = None
+
+        reference = (weakref.WeakMethod(listener, forget) if hasattr(listener, '__func__')
+                     else weakref.ref(listener, forget))
+
+        def caller(*args):
+            if (target := reference()) is not None:
+                target(*args)
+
+        return caller
+
+
+_pending_events: Dict[Event, None] = {}
+
+
+def dispatch_deferred():
+    # рассылка всех отложенных событий, накопленных за такт; вызывается игровым циклом (Simulation.run),
+    # без него отложенные события и их аргументы остаются в очереди
+    while _pending_events:
+        events = list(_pending_events)
+        _pending_events.clear()
+        for event in events:
+            event.dispatch()
+
 
 class StateMachine:
     switched = None  # (previous: Any, next: Any)
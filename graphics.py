@@ -1,33 +1,130 @@
-import math
-from typing import Optional, List
+import functools
+from collections import OrderedDict, deque
+from typing import Optional, Callable, Hashable, Dict, List, Iterable, Iterator, Tuple
 
-from PySide2.QtCore import QRect, QTimer, Qt, QPoint, Signal, QObject, QRectF, QPointF, QTimeLine
-from PySide2.QtGui import QPixmap, QPainter, QWheelEvent, QMouseEvent, QSurfaceFormat, QPalette
+from PySide2.QtCore import QRect, QTimer, Qt, QPoint, Signal, QObject, QRectF, QPointF, QTimeLine, QElapsedTimer
+from PySide2.QtGui import QPixmap, QImage, QPainter, QWheelEvent, QMouseEvent, QSurfaceFormat, QPalette, QResizeEvent, \
+    QShowEvent, QPaintEvent
 from PySide2.QtOpenGL import QGL, QGLWidget, QGLFormat
 from PySide2.QtSvg import QSvgRenderer
 from PySide2.QtWidgets import QGraphicsItem, QWidget, QStyleOptionGraphicsItem, QGraphicsObject, QGraphicsView, \
     QOpenGLWidget, QFrame, QGraphicsPixmapItem
 
+import atlas
+import config
+import overlays
+import rastercache
+import simulation
 import resources as rc
 from core import Directions, UnitState, StateMachine
 
 
-class Tile(QGraphicsItem):
-    def __init__(self, sprite: QPixmap, size, parent: Optional[QGraphicsItem] = None):
-        super().__init__(parent)
-        self.sprite = sprite
-        self._size = size
+class PixmapCache:
+    def __init__(self, capacity: int, load: Callable[..., QPixmap]):
+        self._items: Dict[Hashable, QPixmap] = OrderedDict()
+        self._capacity = capacity
+        self._load = load
+        self.hits = 0
+        self.misses = 0
 
     @property
-    def element_size(self) -> int:
-        return self._size
+    def capacity(self) -> int:
+        return self._capacity
 
-    def boundingRect(self) -> QRectF:
-        return QRectF(0, 0, self._size, self._size)
+    def get(self, *key: Hashable) -> QPixmap:
+        if (pixmap := self._items.get(key)) is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+        else:
+            pixmap = self._load(*key)
+            self._items[key] = pixmap
+            self.misses += 1
+            if len(self._items) > self._capacity:
+                self._items.popitem(last=False)
 
-    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = None):
-        painter.setRenderHint(painter.SmoothPixmapTransform)
-        painter.drawPixmap(QPoint(0, 0), self.sprite, QRect(0, 0, self._size, self._size))
+        return pixmap
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self):
+        return f'PixmapCache({len(self)}/{self._capacity}, hits={self.hits}, misses={self.misses})'
+
+
+def load_tile(resource: str, variant: int, size: int) -> QPixmap:
+    filename = config.SURFACE_NAME_TEMPLATE.format(resource, variant)
+    return rastercache.load(rc.get_tile(filename), size)
+
+
+def load_sprite_sheet(resource: str, state: UnitState, from_: Optional[Directions],
+                      to: Directions, size: int) -> QPixmap:
+    return QPixmap(rc.get_animated_sprite(resource, state, from_, to)
+                   ).scaledToHeight(size, mode=Qt.SmoothTransformation)
+
+
+def level_of_detail(scale: float) -> float:
+    # самый мелкий из заранее подготовленных уровней, который ещё не меньше масштаба отображения
+    result = config.LOD_SCALES[0]
+    for level in config.LOD_SCALES:
+        if level >= scale:
+            result = level
+    return result
+
+
+def painter_level_of_detail(painter: QPainter) -> float:
+    return level_of_detail(QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform()))
+
+
+def animation_keys() -> Iterator[Tuple[UnitState, Optional[Directions], Directions]]:
+    for state in UnitState:
+        for direction in Directions:
+            if state.requires_prev_direction:
+                other_directions = set(Directions)
+                other_directions.discard(direction)
+                for from_ in other_directions:
+                    yield state, from_, direction
+            else:
+                yield state, None, direction
+
+
+def atlas_frames(resource: str, state: UnitState, from_: Optional[Directions],
+                 to: Directions, size: int) -> Optional[List[atlas.Region]]:
+    sheet = sprite_sheets.get(resource, state, from_, to, size)
+    frame_size = sheet.height()
+    image: Optional[QImage] = None
+
+    def cut(index: int) -> QImage:
+        nonlocal image
+        if image is None:
+            image = sheet.toImage()
+        return image.copy(frame_size * index, 0, frame_size, frame_size)
+
+    frames = [atlas.shared().get(('frame', resource, state, from_, to, size, i), functools.partial(cut, i))
+              for i in range(sheet.width() // frame_size)]
+    # кадры, не попавшие в замороженный атлас, рисуются из листа
+    return frames if all(frames) else None
+
+
+def build_atlas(resources: Iterable[str], size: int):
+    # укладывает в атлас то, что рисуется прямо в OpenGL: курсоры и кадры юнитов, и замораживает его.
+    # Блоки местности рисуются из растрового кэша Qt (DeviceCoordinateCache), атлас им не нужен
+    for name in overlays.Names:
+        overlays.atlas_region(name, size, size)
+
+    for resource in resources:
+        for state, from_, to in animation_keys():
+            atlas_frames(resource, state, from_, to, size)
+
+    atlas.shared().freeze()
+
+
+# одна отмасштабированная картинка на вариант поверхности и размер для всех клеток
+tiles = PixmapCache(config.TILE_CACHE_SIZE, load_tile)
+# раскадровки общие для всех юнитов одного типа, кадры рисуются прямо из листа
+sprite_sheets = PixmapCache(config.SPRITE_SHEET_CACHE_SIZE, load_sprite_sheet)
 
 
 class SVGTile(QGraphicsItem):
@@ -46,23 +143,98 @@ class SVGTile(QGraphicsItem):
         self.renderer.render(painter, self.boundingRect())
 
 
+class AnimationClock(QObject):
+    _instance = None
+
+    def __init__(self, interval: int, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._animations: Dict['FrameAnimation', None] = {}
+        self._elapsed = QElapsedTimer()
+        self._elapsed.start()
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._tick)
+
+    @classmethod
+    def instance(cls) -> 'AnimationClock':
+        if cls._instance is None:
+            cls._instance = cls(config.ANIMATION_CLOCK_INTERVAL)
+        return cls._instance
+
+    def now(self) -> int:
+        return self._elapsed.elapsed()
+
+    def add(self, animation: 'FrameAnimation'):
+        self._animations[animation] = None
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def remove(self, animation: 'FrameAnimation'):
+        self._animations.pop(animation, None)
+        if not self._animations:
+            self._timer.stop()
+
+    def is_active(self, animation: 'FrameAnimation') -> bool:
+        return animation in self._animations
+
+    def __len__(self) -> int:
+        return len(self._animations)
+
+    def _tick(self):
+        now = self.now()
+        updated = [animation for animation in list(self._animations) if animation.advance(now)]
+
+        # перерисовка запрашивается, когда все анимации уже переключили кадр
+        for animation in updated:
+            if animation in self._animations:
+                animation.frame_updated.emit()
+
+
+class SimulationTimer(QObject):
+    def __init__(self, simulation_: simulation.Simulation, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._simulation = simulation_
+        self._elapsed = QElapsedTimer()
+        self._started = 0
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(simulation_.tick_duration)
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        self._elapsed.start()
+        self._started = self._simulation.tick
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        # такты догоняют реальное время, даже если таймер сработал с опозданием
+        due = self._started + self._elapsed.elapsed() // self._simulation.tick_duration
+        self._simulation.run(max(0, due - self._simulation.tick))
+
+
 class FrameAnimation(QObject):
     frame_updated = Signal()
     finished = Signal()
 
-    def __init__(self, sprite_sheet: QPixmap, frames_per_second: int, parent: Optional[QObject] = None):
+    def __init__(self, sprite_sheet: QPixmap, frames_per_second: int, parent: Optional[QObject] = None,
+                 levels: Optional[Dict[float, QPixmap]] = None, frames: Optional[List[atlas.Region]] = None):
 
         super().__init__(parent)
         self._current_frame = 0
-        self._frames: List[QPixmap] = []
+        self._sprite_sheet = sprite_sheet
+        self._levels = levels or {}
+        self._frames = frames
+        self._frame_size = sprite_sheet.height()
         self._frame_count = sprite_sheet.width() // sprite_sheet.height()
         self._frames_per_second = frames_per_second
-
-        self._animation_timer = QTimer()
-        self._animation_timer.setTimerType(Qt.PreciseTimer)
-        self._animation_timer.timeout.connect(self._update_frame)
-
-        self._cut(sprite_sheet)
+        self._started = 0
+        self._advanced = 0
 
     @property
     def frame_count(self) -> int:
@@ -75,8 +247,16 @@ class FrameAnimation(QObject):
     def get_current_frame_number(self) -> int:
         return self._current_frame
 
-    def get_current_frame(self) -> QPixmap:
-        return self._frames[self._current_frame]
+    @property
+    def sprite_sheet(self) -> QPixmap:
+        return self._sprite_sheet
+
+    @property
+    def frame_size(self) -> int:
+        return self._frame_size
+
+    def get_current_frame_rect(self) -> QRect:
+        return QRect(self._frame_size * self._current_frame, 0, self._frame_size, self._frame_size)
 
     def increment_frame(self):
         if self.is_last_frame():
@@ -92,38 +272,59 @@ class FrameAnimation(QObject):
         self._current_frame = 0
 
     def is_running(self) -> bool:
-        return self._animation_timer.isActive()
+        return AnimationClock.instance().is_active(self)
 
     def run(self, frame: int = 0, frames_per_second=None):
         if not self.is_running():
+            clock = AnimationClock.instance()
             self._current_frame = frame
             self._frames_per_second = frames_per_second or self.frames_per_second
-            self._animation_timer.start(math.ceil(1000 / self.frames_per_second))
+            self._started = clock.now()
+            self._advanced = 0
+            clock.add(self)
 
     def stop(self):
         if self.is_running():
-            self._animation_timer.stop()
+            AnimationClock.instance().remove(self)
+
+    def advance(self, now: int) -> bool:
+        # номер кадра вычисляется по времени с начала анимации, а не по числу срабатываний таймера
+        frames = (now - self._started) * self._frames_per_second // 1000
+        steps = frames - self._advanced
+        if steps <= 0:
+            return False
+
+        self._advanced = frames
+        position = self._current_frame + steps
+        if position >= self._frame_count:
+            self._current_frame = position % self._frame_count
+            self.finished.emit()
+        else:
+            self._current_frame = position
+
+        return True
 
-    def draw(self, painter: QPainter):
+    def draw(self, painter: QPainter, level: float = 1.0):
         painter.setRenderHint(painter.SmoothPixmapTransform)
-        painter.drawPixmap(QPoint(0, 0), self.get_current_frame())
+        if self._frames and level == 1.0:
+            self._frames[self._current_frame].draw(painter, QRectF(0, 0, self._frame_size, self._frame_size))
+        elif (sheet := self._levels.get(level)) is None or level == 1.0:
+            painter.drawPixmap(QPoint(0, 0), self._sprite_sheet, self.get_current_frame_rect())
+        else:
+            # уменьшенный лист растягивается до исходного размера кадра, итоговый масштаб близок к 1:1
+            size = sheet.height()
+            painter.drawPixmap(QRectF(0, 0, self._frame_size, self._frame_size), sheet,
+                               QRectF(size * self._current_frame, 0, size, size))
 
     @classmethod
     def load(cls, resource: str, state: UnitState, from_: Optional[Directions],
              to: Directions, frames_per_second: int, size: int):
 
-        return cls(QPixmap(rc.get_animated_sprite(resource, state, from_, to)
-                           ).scaledToHeight(size, mode=Qt.SmoothTransformation), frames_per_second)
-
-    def _update_frame(self):
-        self.increment_frame()
-        self.frame_updated.emit()
-
-    def _cut(self, pixmap: QPixmap):
-        size = pixmap.height()
-
-        for i in range(0, self._frame_count):
-            self._frames.append(pixmap.copy(QRect(size * i, 0, size, size)))
+        levels = {level: sprite_sheets.get(resource, state, from_, to, max(1, round(size * level)))
+                  for level in config.LOD_SCALES}
+        frames = atlas_frames(resource, state, from_, to, size) if atlas.enabled() else None
+        return cls(sprite_sheets.get(resource, state, from_, to, size), frames_per_second,
+                   levels=levels, frames=frames)
 
 
 class AnimatedSprite(QGraphicsObject, QGraphicsPixmapItem):
@@ -142,17 +343,9 @@ class AnimatedSprite(QGraphicsObject, QGraphicsPixmapItem):
         return self.animations.get_action()
 
     def load_states(self, resource: str, frames_per_second: int, size: int):
-        for state in UnitState:
-            for direction in Directions:
-                if state.requires_prev_direction:
-                    other_directions = set(Directions)
-                    other_directions.discard(direction)
-                    for from_ in other_directions:
-                        animation = FrameAnimation.load(resource, state, from_, direction, frames_per_second, size)
-                        self.animations.add((state, from_, direction), animation)
-                else:
-                    animation = FrameAnimation.load(resource, state, None, direction, frames_per_second, size)
-                    self.animations.add((state, None, direction), animation)
+        for state, from_, to in animation_keys():
+            animation = FrameAnimation.load(resource, state, from_, to, frames_per_second, size)
+            self.animations.add((state, from_, to), animation)
 
     def _update_animations(self, previous: Optional[FrameAnimation], next_: FrameAnimation):
         if previous:
@@ -161,11 +354,18 @@ class AnimatedSprite(QGraphicsObject, QGraphicsPixmapItem):
 
         next_.frame_updated.connect(self._set_next_frame)
         next_.run()
+        self.update()
 
-    def _set_next_frame(self):
+    def boundingRect(self) -> QRectF:
+        size = animation.frame_size if (animation := self.current_animation) else 0
+        return QRectF(0, 0, size, size)
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = None):
         if animation := self.current_animation:
-            self.setPixmap(animation.get_current_frame())
-            self.update()
+            animation.draw(painter, painter_level_of_detail(painter))
+
+    def _set_next_frame(self):
+        self.update()
 
 
 class RubberSelectableGraphicsView(QGraphicsView):
@@ -222,20 +422,55 @@ class CursorTrackedScrollGraphicsView(QGraphicsView):
         super().mouseMoveEvent(event)
 
 
-class ScalableGraphicsView(QGraphicsView):
-    def __init__(self, parent: Optional[QWidget] = None):
-        super().__init__(parent)
+class VisibleRectTrackedGraphicsView(QGraphicsView):
+    visible_rect_changed = Signal(QRectF)
 
-        self.setResizeAnchor(QGraphicsView.NoAnchor)
-        self.setTransformationAnchor(QGraphicsView.NoAnchor)
-        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.setFrameShape(QFrame.NoFrame)
+    def visible_rect(self) -> QRectF:
+        return self.mapToScene(self.viewport().rect()).boundingRect()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        super().scrollContentsBy(dx, dy)
+        self._update_visible_rect()
+
+    def resizeEvent(self, event: QResizeEvent):
+        super().resizeEvent(event)
+        self._update_visible_rect()
 
+    def showEvent(self, event: QShowEvent):
+        super().showEvent(event)
+        self._update_visible_rect()
+
+    def _update_visible_rect(self):
+        self.visible_rect_changed.emit(self.visible_rect())
+
+
+class ZoomController(QObject):
+    scaled = Signal()
+    level_changed = Signal(float)
+
+    def __init__(self, view: QGraphicsView, minimum: float = 0.3, maximum: float = 1.4):
+        super().__init__(view)
+        self._view = view
+        self._minimum = minimum
+        self._maximum = maximum
         self._scheduled_scalings = 0
         self._mouse_position = None
+        self._level = level_of_detail(self.factor())
 
-    def wheelEvent(self, event: QWheelEvent):
+        # одна анимация масштаба на все события колеса
+        self._timeline = QTimeLine(100, self)
+        self._timeline.setUpdateInterval(10)
+        self._timeline.valueChanged.connect(self._scale)
+        self._timeline.finished.connect(self._finish)
+
+    @property
+    def level(self) -> float:
+        return self._level
+
+    def factor(self) -> float:
+        return self._view.transform().mapRect(QRectF(0, 0, 1, 1)).width()
+
+    def wheel(self, event: QWheelEvent):
         self._mouse_position = event.pos()
         degrees = event.delta() / 8
         number_of_steps = degrees / 15
@@ -244,21 +479,46 @@ class ScalableGraphicsView(QGraphicsView):
         if self._scheduled_scalings * number_of_steps < 0:
             self._scheduled_scalings = number_of_steps
 
-        timeline = QTimeLine(100, self)
-        timeline.setUpdateInterval(10)
-        timeline.valueChanged.connect(self._scale)
-
-        timeline.start()
+        if self._timeline.state() == QTimeLine.Running:
+            self._timeline.setCurrentTime(0)
+        else:
+            self._timeline.start()
 
     def _scale(self, _: float):
-        old = self.mapToScene(self._mouse_position)
+        view = self._view
+        old = view.mapToScene(self._mouse_position)
         scale_factor = 1.0 + self._scheduled_scalings / 300.0
 
-        factor = self.transform().scale(scale_factor, scale_factor).mapRect(QRectF(0, 0, 1, 1)).width()
-        if 0.3 <= factor <= 1.4:
-            self.scale(scale_factor, scale_factor)
-            delta = self.mapToScene(self._mouse_position) - old
-            self.translate(delta.x(), delta.y())
+        factor = view.transform().scale(scale_factor, scale_factor).mapRect(QRectF(0, 0, 1, 1)).width()
+        if self._minimum <= factor <= self._maximum:
+            view.scale(scale_factor, scale_factor)
+            delta = view.mapToScene(self._mouse_position) - old
+            view.translate(delta.x(), delta.y())
+            self.scaled.emit()
+
+            if (level := level_of_detail(factor)) != self._level:
+                self._level = level
+                self.level_changed.emit(level)
+
+    def _finish(self):
+        self._scheduled_scalings = 0
+
+
+class ScalableGraphicsView(VisibleRectTrackedGraphicsView):
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+
+        self.setResizeAnchor(QGraphicsView.NoAnchor)
+        self.setTransformationAnchor(QGraphicsView.NoAnchor)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setFrameShape(QFrame.NoFrame)
+
+        self.zoom = ZoomController(self)
+        self.zoom.scaled.connect(self._update_visible_rect)
+
+    def wheelEvent(self, event: QWheelEvent):
+        self.zoom.wheel(event)
 
 
 class UserControlledGraphicsView(CursorTrackedScrollGraphicsView,
@@ -276,18 +536,183 @@ class OpenGLGraphicsView(QGraphicsView):
         format_.setProfile(QSurfaceFormat.CoreProfile)
         ogl_widget = QOpenGLWidget()
         ogl_widget.setFormat(format_)
+        if config.USE_TEXTURE_ATLAS:
+            atlas.enable()
 
         self.setViewport(ogl_widget)
+        # Qt 5 перерисовывает QOpenGLWidget целиком при любом обновлении, отсечение по областям
+        # ничего не даёт (benchmarks/viewport.py)
         self.setViewportUpdateMode(UserControlledGraphicsView.FullViewportUpdate)
 
 
-# QGLWidget помечен как устаревший, но QOpenGLWidget тормозит на этой версии Qt
+class RasterGraphicsView(QGraphicsView):
+    # обычный вьюпорт-виджет: только его Qt перерисовывает по изменившимся областям,
+    # поэтому только с ним работают частичные обновления и переключение их режимов
+    pass
+
+
+# QGLWidget помечен как устаревший и не встраивается в окно на eglfs; рисует так же быстро, как QOpenGLWidget
 class OGLGraphicsView(QGraphicsView):
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
         self.setViewport(QGLWidget(QGLFormat(QGL.SampleBuffers)))
+        if config.USE_TEXTURE_ATLAS:
+            atlas.enable()
+        # содержимое заднего буфера QGLWidget после swap не определено, частичные обновления невозможны
         self.setViewportUpdateMode(UserControlledGraphicsView.FullViewportUpdate)
 
 
-class GameGraphicsView(OGLGraphicsView, UserControlledGraphicsView):
+class FrameTelemetry:
+    def __init__(self, window: int):
+        self._paint_times = deque(maxlen=window)
+        self._frame_times = deque(maxlen=window)
+
+    def add_paint(self, milliseconds: float):
+        self._paint_times.append(milliseconds)
+
+    def add_frame(self, milliseconds: float):
+        self._frame_times.append(milliseconds)
+
+    @property
+    def paint_time(self) -> float:
+        return sum(self._paint_times) / len(self._paint_times) if self._paint_times else 0.0
+
+    @property
+    def max_paint_time(self) -> float:
+        return max(self._paint_times, default=0.0)
+
+    @property
+    def frame_time(self) -> float:
+        return sum(self._frame_times) / len(self._frame_times) if self._frame_times else 0.0
+
+    @property
+    def fps(self) -> float:
+        frame_time = self.frame_time
+        return 1000 / frame_time if frame_time else 0.0
+
+    def clear(self):
+        self._paint_times.clear()
+        self._frame_times.clear()
+
+    def __len__(self) -> int:
+        return len(self._paint_times)
+
+
+class AdaptiveUpdateGraphicsView(QGraphicsView):
+    telemetry_updated = Signal(object)  # FrameTelemetry
+    update_mode_changed = Signal(object)  # QGraphicsView.ViewportUpdateMode
+
+    MODE_NAMES = {
+        QGraphicsView.FullViewportUpdate: 'full',
+        QGraphicsView.BoundingRectViewportUpdate: 'bounding rect',
+        QGraphicsView.SmartViewportUpdate: 'smart',
+    }
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.telemetry = FrameTelemetry(config.FRAME_TELEMETRY_WINDOW)
+        self._adaptive = True
+        self._readout_visible = config.SHOW_FRAME_TELEMETRY
+        self._frame_timer = QElapsedTimer()
+        self._report_timer = QElapsedTimer()
+
+    @property
+    def adaptive_update(self) -> bool:
+        return self._adaptive
+
+    def set_adaptive_update(self, enabled: bool):
+        self._adaptive = enabled
+
+    @property
+    def telemetry_visible(self) -> bool:
+        return self._readout_visible
+
+    def set_telemetry_visible(self, visible: bool):
+        self._readout_visible = visible
+        self._update_readout()
+
+    def supports_partial_updates(self) -> bool:
+        # задний буфер QGLWidget после swap не сохраняется, а QOpenGLWidget Qt 5 перерисовывает целиком
+        return not isinstance(self.viewport(), (QGLWidget, QOpenGLWidget))
+
+    def update_mode_for(self, animating: int) -> QGraphicsView.ViewportUpdateMode:
+        # немного анимаций - перерисовываются отдельные области, много - их общий прямоугольник,
+        # когда анимировано почти всё, дешевле перерисовать весь экран без отсечения
+        if not self.supports_partial_updates():
+            return QGraphicsView.FullViewportUpdate
+        if animating <= config.SMART_UPDATE_MAX_ANIMATIONS:
+            return QGraphicsView.SmartViewportUpdate
+        if animating <= config.BOUNDING_RECT_UPDATE_MAX_ANIMATIONS:
+            return QGraphicsView.BoundingRectViewportUpdate
+        return QGraphicsView.FullViewportUpdate
+
+    def paintEvent(self, event: QPaintEvent):
+        paint_timer = QElapsedTimer()
+        paint_timer.start()
+        super().paintEvent(event)
+        self.telemetry.add_paint(paint_timer.nsecsElapsed() / 1000000)
+
+        if self._frame_timer.isValid():
+            interval = self._frame_timer.restart()
+            # длинная пауза между кадрами - простой, а не медленный кадр
+            if interval <= config.FRAME_IDLE_THRESHOLD:
+                self.telemetry.add_frame(interval)
+        else:
+            self._frame_timer.start()
+
+        if not self._report_timer.isValid() or self._report_timer.elapsed() >= config.FRAME_TELEMETRY_INTERVAL:
+            self._report_timer.start()
+            self._report()
+
+    def drawForeground(self, painter: QPainter, rect: QRectF):
+        super().drawForeground(painter, rect)
+        if not self._readout_visible:
+            return
+
+        painter.save()
+        painter.resetTransform()
+        readout = self._readout_rect()
+        painter.fillRect(readout, rc.TELEMETRY_BACKGROUND_COLOR)
+        painter.setPen(rc.TELEMETRY_TEXT_COLOR)
+        painter.drawText(readout.adjusted(config.TELEMETRY_MARGIN, 0, 0, 0), Qt.AlignVCenter, self._readout_text())
+        painter.restore()
+
+    def _readout_text(self) -> str:
+        telemetry = self.telemetry
+        return f'{telemetry.fps:.0f} fps | frame {telemetry.frame_time:.1f} ms | ' \
+               f'paint {telemetry.paint_time:.1f} ms (max {telemetry.max_paint_time:.1f}) | ' \
+               f'{len(AnimationClock.instance())} animations | ' \
+               f'{self.MODE_NAMES.get(self.viewportUpdateMode(), "other")} update'
+
+    def _readout_rect(self) -> QRect:
+        return QRect(0, 0, self.viewport().width(), self.fontMetrics().height() + 2 * config.TELEMETRY_MARGIN)
+
+    def _report(self):
+        if self._adaptive:
+            mode = self.update_mode_for(len(AnimationClock.instance()))
+            if mode != self.viewportUpdateMode():
+                self.setViewportUpdateMode(mode)
+                self.viewport().update()
+                self.update_mode_changed.emit(mode)
+
+        self.telemetry_updated.emit(self.telemetry)
+        if self._readout_visible:
+            self._update_readout()
+
+    def _update_readout(self):
+        if self.supports_partial_updates():
+            self.viewport().update(self._readout_rect())
+        else:
+            self.viewport().update()
+
+
+if not config.USE_OPENGL_VIEWPORT:
+    ViewportGraphicsView = RasterGraphicsView
+elif config.USE_QOPENGLWIDGET:
+    ViewportGraphicsView = OpenGLGraphicsView
+else:
+    ViewportGraphicsView = OGLGraphicsView
+
+
+class GameGraphicsView(AdaptiveUpdateGraphicsView, ViewportGraphicsView, UserControlledGraphicsView):
     pass
@@ -1,7 +1,7 @@
 import sys
 
 from PySide2.QtWidgets import QApplication
-import models, controllers, graphics, views
+import atlas, models, controllers, graphics, simulation, views
 import config
 from core import Coordinate
 
@@ -13,13 +13,19 @@ def main(argv):
     with open('maps/test3.txt', 'r') as fo:
         field_model.load(fo)
 
-    field_controller = controllers.Field(field_model)
+    game = simulation.Simulation()
+    field_controller = controllers.Field(field_model, game)
+    clock = graphics.SimulationTimer(game, app)
 
     main_view = graphics.GameGraphicsView()
-    scene = views.Field(field_model, field_controller, config.DEFAULT_SQUARE_SIZE)
+    scene = views.Field(field_model, field_controller, config.DEFAULT_SQUARE_SIZE, virtualized=True)
     field_controller.set_view(scene)
+    main_view.visible_rect_changed.connect(scene.set_visible_rect)
     main_view.setScene(scene)
 
+    if atlas.enabled():
+        graphics.build_atlas(['red17'], config.DEFAULT_SQUARE_SIZE)
+
     red17 = models.Unit('red17', scene.model, Coordinate(0, 1), models.Speed.medium)
     red17_2 = models.Unit('red17', scene.model, Coordinate(4, 4), models.Speed.fast)
     field_controller.add_unit(red17, 'red17')
@@ -27,6 +33,7 @@ def main(argv):
 
     # main_view.showFullScreen()
     main_view.show()
+    clock.start()
     return app.exec_()
 
 
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import contextlib
+import functools
 import io
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Optional, List
+from typing import Optional, List, Dict, Generic, TypeVar, Iterator, Tuple, Set, Any, Iterable
+
+import numpy as np
 
 import config
+import pathfinding
 import surfaces
-from core import Coordinate, Directions, Event, Container
+from core import Coordinate, Directions, Event
 
 
 class HavingPosition(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def position(self) -> Coordinate:
@@ -102,6 +109,13 @@ class Unit(HavingPosition):
     def field(self) -> Field:
         return self._field
 
+    def speed_on(self, surface: surfaces.Surface) -> Speed:
+        if surface.speed > 0:
+            return self._original_speed.speed_up()
+        if surface.speed < 0:
+            return self._original_speed.slow_down()
+        return self._original_speed
+
     def move(self, direction: Directions) -> bool:
         moved = False
 
@@ -110,12 +124,8 @@ class Unit(HavingPosition):
 
         if destination and destination.passable:
             self.field.at_point(self.position).unit_container.remove()
-            self._speed = self._original_speed
-
             destination.unit_container.put(self)
-            if destination.surface.speed != 0:
-                self._speed = (self._speed.speed_up()
-                               if destination.surface.speed > 0 else self._speed.slow_down())
+            self._speed = self.speed_on(destination.surface)
 
             self._position = new_position
             self.moved.notify(direction)
@@ -126,72 +136,58 @@ class Unit(HavingPosition):
         return moved
 
     def generate_path(self, destination: Coordinate) -> Optional[List[Directions]]:
-        result = None
-        map_ = []
-        for y in range(self.field.width):
-            map_.append([])
-            for x in range(self.field.height):
-                cell = self.field.at(x, y)
-                map_[y].append(0 if cell.passable else -1)
-
-        # начальная точка маршрута
-        map_[self.y][self.x] = 1
-
-        if self._find_path(map_, destination):
-            result = self._generate_path(map_, destination)
+        field = self.field
+        passability = field.passability
+        result = pathfinding.find_path(self.position, destination, field.width, field.height,
+                                       lambda x, y: passability.item(y, x))
+        if result is not None:
             self.route_calculated.notify(self.position, destination, result)
 
         return result
 
-    @staticmethod
-    def _find_path(map_: List[List[int]], destination: Coordinate) -> bool:
-        weight = 1
-        for i in range(len(map_) * len(map_[0])):
-            weight += 1
-
-            for y in range(len(map_)):
-                for x in range(len(map_[y])):
-                    if map_[y][x] == (weight - 1):
-                        if y > 0 and map_[y - 1][x] == 0:
-                            map_[y - 1][x] = weight
 
-                        if y < (len(map_) - 1) and map_[y + 1][x] == 0:
-                            map_[y + 1][x] = weight
+class Footprint:
+    def __init__(self, points: Iterable[Coordinate]):
+        self._points = sorted({(point.x, point.y) for point in points})
+        if not self._points:
+            raise ValueError('empty footprint')
 
-                        if x > 0 and map_[y][x - 1] == 0:
-                            map_[y][x - 1] = weight
+        xs, ys = [x for x, _ in self._points], [y for _, y in self._points]
+        self.left, self.top, self.right, self.bottom = min(xs), min(ys), max(xs), max(ys)
+        self.width = self.right - self.left + 1
+        self.height = self.bottom - self.top + 1
+        self.rectangular = len(self._points) == self.width * self.height
 
-                        if x < (len(map_[y]) - 1) and map_[y][x + 1] == 0:
-                            map_[y][x + 1] = weight
-
-                        if (abs(y - destination.y) + abs(x - destination.x)) == 1:
-                            map_[destination.y][destination.x] = weight
-                            return True
-        return False
-
-    @staticmethod
-    def _generate_path(map_: List[List], destination: Coordinate) -> List[Directions]:
-        y = destination.y
-        x = destination.x
-
-        weight = map_[y][x]
-        result = list(range(weight))
-        while weight:
-            weight -= 1
-            if y > 0 and map_[y - 1][x] == weight:
-                result[weight] = Directions.south
-                y -= 1
-            elif y < (len(map_) - 1) and map_[y + 1][x] == weight:
-                result[weight] = Directions.north
-                y += 1
-            elif x > 0 and map_[y][x - 1] == weight:
-                result[weight] = Directions.east
-                x -= 1
-            elif x < (len(map_[y]) - 1) and map_[y][x + 1] == weight:
-                result[weight] = Directions.west
-                x += 1
-
-        return result[1:]
+    @property
+    def key(self) -> Tuple[Tuple[int, int], ...]:
+        return tuple(self._points)
+
+    def fit(self, buildability: np.ndarray, left: int = 0, top: int = 0,
+            right: Optional[int] = None, bottom: Optional[int] = None) -> Tuple[int, int, np.ndarray]:
+        # маска опорных точек в прямоугольнике [left, right] x [top, bottom], для которых
+        # основание целиком помещается на карте и стоит на пригодных для строительства клетках
+        height, width = buildability.shape
+        right = width - 1 if right is None else right
+        bottom = height - 1 if bottom is None else bottom
+        left, top = max(left, -self.left), max(top, -self.top)
+        right, bottom = min(right, width - 1 - self.right), min(bottom, height - 1 - self.bottom)
+        if left > right or top > bottom:
+            return left, top, np.zeros((0, 0), dtype=bool)
+
+        area = buildability[top + self.top:bottom + self.bottom + 1, left + self.left:right + self.right + 1]
+        rows, columns = bottom - top + 1, right - left + 1
+        if self.rectangular:
+            # таблица сумм по областям: сумма окна за четыре обращения, независимо от размера основания
+            sums = np.zeros((area.shape[0] + 1, area.shape[1] + 1), dtype=np.int32)
+            np.cumsum(np.cumsum(area, axis=0, dtype=np.int32), axis=1, out=sums[1:, 1:])
+            window = (sums[self.height:, self.width:] - sums[:rows, self.width:]
+                      - sums[self.height:, :columns] + sums[:rows, :columns])
+            return left, top, window == self.width * self.height
+
+        result = np.ones((rows, columns), dtype=bool)
+        for x, y in self._points:
+            result &= area[y - self.top:y - self.top + rows, x - self.left:x - self.left + columns]
+        return left, top, result
 
 
 class Structure:
@@ -204,6 +200,7 @@ class Structure:
         self._passable = passable
         self._is_placed = False
         self._place = place
+        self._footprint: Optional[Footprint] = None
         self._name = name
 
     @property
@@ -221,6 +218,19 @@ class Structure:
     def is_placed(self):
         return self._is_placed
 
+    @property
+    def footprint(self) -> Footprint:
+        if self._footprint is None:
+            self._footprint = Footprint(self._place)
+        return self._footprint
+
+    def fit_mask(self, field: Field) -> np.ndarray:
+        return field.fit_mask(self.footprint)
+
+    def anchors(self, field: Field) -> np.ndarray:
+        # все позиции, куда строение можно поставить, столбцы (x, y)
+        return np.argwhere(self.fit_mask(field))[:, ::-1]
+
     def place(self, field: Field, position: Coordinate, direction: Directions) -> bool:
         if self._is_placed:
             raise ValueError
@@ -233,9 +243,10 @@ class Structure:
             if not cell.can_build:
                 break
         else:
-            for point in self._place:
-                cell = field.at_point(point + position)
-                cell.struct_container.put(self)
+            with field.batch():
+                for point in self._place:
+                    cell = field.at_point(point + position)
+                    cell.struct_container.put(self)
 
             self._is_placed = True
             self._direction = direction
@@ -245,9 +256,10 @@ class Structure:
         return result
 
     def destroy(self, field: Field) -> Optional[Item]:
-        for point in self._place:
-            cell = field.at_point(self._start_pos + point)
-            cell.struct_container.remove()
+        with field.batch():
+            for point in self._place:
+                cell = field.at_point(self._start_pos + point)
+                cell.struct_container.remove()
 
         return None
 
@@ -267,54 +279,292 @@ class Item:
         return self._quantity
 
 
+T = TypeVar('T')
+
+# начальная ёмкость массива при загрузке, дальше он растёт вдвое
+LOAD_CHUNK_ROWS = 1024
+
+
+class Layer(Generic[T]):
+    placed = None  # (x: int, y: int, item: T)
+    removed = None  # (x: int, y: int, item: T)
+
+    def __init__(self, width: int, height: int):
+        self.placed = Event()
+        self.removed = Event()
+        # в клетках хранятся только ключи, 0 - пустая клетка
+        self._keys = np.zeros((height, width), dtype=np.uint32)
+        self._items: Dict[int, T] = {}
+        self._item_keys: Dict[int, int] = {}
+        self._counts: Dict[int, int] = {}
+        self._next_key = 1
+
+    @property
+    def keys(self) -> np.ndarray:
+        return self._keys
+
+    def get(self, x: int, y: int) -> Optional[T]:
+        return self._items.get(self._keys.item(y, x))
+
+    def is_empty(self, x: int, y: int) -> bool:
+        return not self._keys.item(y, x)
+
+    def put(self, x: int, y: int, item: T):
+        if self._keys.item(y, x):
+            raise ValueError
+
+        # объект, занимающий несколько клеток (строение), получает один ключ
+        key = self._item_keys.get(id(item))
+        if key is None:
+            key = self._next_key
+            self._next_key += 1
+            self._item_keys[id(item)] = key
+            self._items[key] = item
+            self._counts[key] = 0
+
+        self._counts[key] += 1
+        self._keys[y, x] = key
+        self.placed.notify(x, y, item)
+
+    def remove(self, x: int, y: int) -> T:
+        key = self._keys.item(y, x)
+        if not key:
+            raise ValueError
+
+        item = self._items[key]
+        self._keys[y, x] = 0
+        self._counts[key] -= 1
+        if not self._counts[key]:
+            del self._counts[key], self._items[key], self._item_keys[id(item)]
+
+        self.removed.notify(x, y, item)
+        return item
+
+
+class UnitIndex:
+    def __init__(self, layer: Layer[Unit], bucket_cells: int):
+        # юниты разложены по корзинам равномерной сетки, корзина хранит клетку юнита
+        self._bucket_cells = bucket_cells
+        self._buckets: Dict[Tuple[int, int], Dict[Unit, Tuple[int, int]]] = {}
+        self._count = 0
+        layer.placed.subscribe(self._add)
+        layer.removed.subscribe(self._remove)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Unit]:
+        for bucket in self._buckets.values():
+            yield from bucket
+
+    def __contains__(self, unit: Unit) -> bool:
+        return any(unit in bucket for bucket in self._buckets.values())
+
+    def in_region(self, left: int, top: int, right: int, bottom: int) -> List[Unit]:
+        # границы включаются; если корзин в области больше, чем занятых, перебираются только занятые
+        size = self._bucket_cells
+        columns = range(left // size, right // size + 1)
+        rows = range(top // size, bottom // size + 1)
+        if len(columns) * len(rows) > len(self._buckets):
+            buckets = [bucket for (column, row), bucket in self._buckets.items() if column in columns and row in rows]
+        else:
+            buckets = [bucket for row in rows for column in columns if (bucket := self._buckets.get((column, row)))]
+
+        return [unit for bucket in buckets for unit, (x, y) in bucket.items()
+                if left <= x <= right and top <= y <= bottom]
+
+    def _add(self, x: int, y: int, unit: Unit):
+        key = (x // self._bucket_cells, y // self._bucket_cells)
+        self._buckets.setdefault(key, {})[unit] = (x, y)
+        self._count += 1
+
+    def _remove(self, x: int, y: int, unit: Unit):
+        key = (x // self._bucket_cells, y // self._bucket_cells)
+        bucket = self._buckets[key]
+        del bucket[unit]
+        if not bucket:
+            del self._buckets[key]
+        self._count -= 1
+
+
+class ReservationTable:
+    # конец брони юнита, который остановился и стоит, пока не получит новый приказ
+    FOREVER = float('inf')
+
+    def __init__(self):
+        # клетка -> список броней (начало, конец, владелец), интервалы полуоткрытые, в тактах
+        self._cells: Dict[Tuple[int, int], List[Tuple[int, int, Any]]] = {}
+        self._owned: Dict[Any, List[Tuple[int, int]]] = {}
+        self._parked: Set[Any] = set()
+
+    def __contains__(self, owner) -> bool:
+        return owner in self._owned
+
+    def __len__(self) -> int:
+        return len(self._owned)
+
+    def reserve(self, owner, x: int, y: int, start: int, end: int):
+        self._cells.setdefault((x, y), []).append((start, end, owner))
+        self._owned.setdefault(owner, []).append((x, y))
+
+    def park(self, owner, x: int, y: int, start: int):
+        self.release(owner)
+        self.reserve(owner, x, y, start, self.FOREVER)
+        self._parked.add(owner)
+
+    def is_parked(self, owner) -> bool:
+        return owner in self._parked
+
+    def release(self, owner):
+        self._parked.discard(owner)
+        for key in self._owned.pop(owner, ()):
+            if (bookings := self._cells.get(key)) is not None:
+                bookings[:] = [booking for booking in bookings if booking[2] is not owner]
+                if not bookings:
+                    del self._cells[key]
+
+    def is_free(self, x: int, y: int, start: int, end: int, owner=None) -> bool:
+        for booked_start, booked_end, booked_owner in self._cells.get((x, y), ()):
+            if booked_owner is not owner and booked_start < end and start < booked_end:
+                return False
+        return True
+
+    def owner_at(self, x: int, y: int, tick: int):
+        for start, end, owner in self._cells.get((x, y), ()):
+            if start <= tick < end:
+                return owner
+        return None
+
+
+class Slot(Generic[T]):
+    __slots__ = ('_layer', '_x', '_y')
+
+    def __init__(self, layer: Layer[T], x: int, y: int):
+        self._layer = layer
+        self._x = x
+        self._y = y
+
+    @property
+    def item(self) -> Optional[T]:
+        return self._layer.get(self._x, self._y)
+
+    def is_empty(self) -> bool:
+        return self._layer.is_empty(self._x, self._y)
+
+    def put(self, item: T):
+        self._layer.put(self._x, self._y, item)
+
+    def remove(self) -> T:
+        return self._layer.remove(self._x, self._y)
+
+
 class Cell(HavingPosition):
+    __slots__ = ('_field', '_x', '_y')
 
-    def __init__(self, surface: surfaces.Surface, position: Coordinate):
-        super().__init__()
-        self.struct_container: Container[Structure] = Container()
-        self.unit_container: Container[Unit] = Container()
-        self.item_container: Container[Item] = Container()
-        self._position = position
-        self._surface = surface
+    def __init__(self, field: Field, x: int, y: int):
+        self._field = field
+        self._x = x
+        self._y = y
+
+    @property
+    def field(self) -> Field:
+        return self._field
+
+    @property
+    def surface(self) -> surfaces.Surface:
+        return self._field.surface_at(self._x, self._y)
+
+    @surface.setter
+    def surface(self, surface: surfaces.Surface):
+        self._field.set_surface(self._x, self._y, surface)
+
+    @property
+    def struct_container(self) -> Slot[Structure]:
+        return Slot(self._field.structures, self._x, self._y)
+
+    @property
+    def unit_container(self) -> Slot[Unit]:
+        return Slot(self._field.units, self._x, self._y)
 
     @property
-    def surface(self):
-        return self._surface
+    def item_container(self) -> Slot[Item]:
+        return Slot(self._field.items, self._x, self._y)
 
     @property
     def x(self) -> int:
-        return self._position.x
+        return self._x
 
     @property
     def y(self) -> int:
-        return self._position.y
+        return self._y
 
     @property
     def position(self) -> Coordinate:
-        return self._position
+        return Coordinate(self._x, self._y)
 
     @property
     def passable(self) -> bool:
-        return (self.surface.passable
-                and self.unit_container.is_empty()
-                and (self.struct_container.is_empty() or not self.struct_container.item.passable))
+        return self._field.passability.item(self._y, self._x)
+
+    @property
+    def traversable(self) -> bool:
+        # проходимость без учёта юнитов
+        return self._field.traversability.item(self._y, self._x)
 
     @property
     def can_build(self) -> bool:
-        return (self.surface.type == surfaces.Type.hard
-                and self.struct_container.is_empty()
-                and self.item_container.is_empty()
-                and self.unit_container.is_empty())
+        return self._field.buildability.item(self._y, self._x)
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, Cell) and self._field is other.field
+                and self._x == other.x and self._y == other.y)
+
+    def __hash__(self) -> int:
+        return hash((id(self._field), self._x, self._y))
 
     def __repr__(self):
         return f'Cell({self.surface.resource})'
 
 
+class FieldDiff:
+    def __init__(self):
+        self.surfaces: Dict[Tuple[int, int], surfaces.Surface] = {}
+        # (имя слоя, x, y, объект)
+        self.placed: List[Tuple[str, int, int, Any]] = []
+        self.removed: List[Tuple[str, int, int, Any]] = []
+
+    @property
+    def cells(self) -> Set[Tuple[int, int]]:
+        result = set(self.surfaces)
+        result.update((x, y) for _, x, y, _ in self.placed)
+        result.update((x, y) for _, x, y, _ in self.removed)
+        return result
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        if not (cells := self.cells):
+            return None
+        xs, ys = [x for x, _ in cells], [y for _, y in cells]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def __bool__(self) -> bool:
+        return bool(self.surfaces or self.placed or self.removed)
+
+    def __repr__(self) -> str:
+        return f'FieldDiff(surfaces={len(self.surfaces)}, placed={len(self.placed)}, removed={len(self.removed)})'
+
+
 class Field:
+    surface_changed = None  # (x: int, y: int, surface: surfaces.Surface)
+    changed = None  # (diff: FieldDiff)
+    load_progress = None  # (rows: int)
+
     def __init__(self, width: int, height: int):
-        self._matrix = self._create_empty_matrix(width, height)
-        self._width = width
-        self._height = height
+        self.surface_changed = Event()
+        self.changed = Event()
+        self.load_progress = Event()
+        self._batch_depth = 0
+        self._diff: Optional[FieldDiff] = None
+        self._allocate(width, height)
 
     @property
     def width(self) -> int:
@@ -324,36 +574,222 @@ class Field:
     def height(self) -> int:
         return self._height
 
+    @property
+    def surface_codes(self) -> np.ndarray:
+        return self._surface_codes_view
+
+    @property
+    def passability(self) -> np.ndarray:
+        return self._passability_view
+
+    @property
+    def traversability(self) -> np.ndarray:
+        return self._traversability_view
+
+    @property
+    def buildability(self) -> np.ndarray:
+        return self._buildability_view
+
     def at(self, x: int, y: int) -> Optional[Cell]:
         if (0 <= x < self._width) and (0 <= y < self._height):
-            return self._matrix[y][x]
+            return Cell(self, x, y)
         return None
 
     def at_point(self, point: Coordinate) -> Cell:
         return self.at(point.x, point.y)
 
-    def load(self, stream: io.TextIO):
-        lines = [l for l in stream]
+    def surface_at(self, x: int, y: int) -> surfaces.Surface:
+        return surfaces.by_code(self._surface_codes.item(y, x))
+
+    def set_surface(self, x: int, y: int, surface: surfaces.Surface):
+        self._surface_codes[y, x] = surfaces.code_of(surface)
+        self._update_cell(x, y)
+        self.surface_changed.notify(x, y, surface)
+        if (diff := self._diff) is None:
+            if not self.changed.listener_count:
+                return
+            diff = FieldDiff()
+
+        diff.surfaces[(x, y)] = surface
+        if diff is not self._diff:
+            self.changed.notify(diff)
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[FieldDiff]:
+        # изменения внутри batch сразу видны в слоях поля; поклеточные события (surface_changed,
+        # placed и removed слоёв) рассылаются сразу, как и вне batch, а подписчики changed
+        # получают одно общее изменение при выходе из внешнего batch; отката нет
+        if not self._batch_depth:
+            self._diff = FieldDiff()
+        self._batch_depth += 1
+        try:
+            yield self._diff
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                diff, self._diff = self._diff, None
+                if diff:
+                    self.changed.notify(diff)
+
+    def in_batch(self) -> bool:
+        return self._batch_depth > 0
+
+    def fit_mask(self, footprint: Footprint) -> np.ndarray:
+        # маска считается один раз на форму основания, после строительства и сноса
+        # пересчитывается только окрестность изменившихся клеток
+        if (entry := self._fits.get(footprint.key)) is None:
+            entry = self._fits[footprint.key] = [footprint, np.zeros((self._height, self._width), dtype=bool), None]
+            self._refit(entry, (0, 0, self._width - 1, self._height - 1))
+        elif entry[2] is not None:
+            self._refit(entry, entry[2])
+        return self._read_only(entry[1])
+
+    def assign(self, surface_codes: np.ndarray, palette: List[surfaces.Surface]):
+        # коды указывают на элементы palette; если она совпадает с общей палитрой,
+        # массив используется без копирования, например отображённый в память файл карты
+        if surface_codes.dtype != np.uint8 or surface_codes.ndim != 2:
+            raise ValueError(f'unsupported surface codes array: {surface_codes.dtype}{surface_codes.shape}')
+
+        codes = np.array([surfaces.code_of(i) for i in palette], dtype=np.uint8)
+        if np.any(codes != np.arange(len(codes))):
+            surface_codes = codes[surface_codes]
+
+        height, width = surface_codes.shape
+        self._allocate(width, height, surface_codes)
 
-        self._height = len(lines)
-        self._width = len(lines[0].split(config.TAB_LITERAL))
-        self._matrix = self._create_empty_matrix(self._width, self._height)
+    def load(self, stream: io.TextIO):
+        for _ in self.load_rows(stream):
+            pass
+
+    def load_rows(self, stream: io.TextIO) -> Iterator[int]:
+        # карта разбирается построчно за один проход, поэтому подходит и поток без перемотки;
+        # после каждой строки отдаётся число загруженных строк, поле заменяется только в конце
+        codes: Optional[np.ndarray] = None
+        by_name: Dict[str, int] = {}
+        width = height = 0
+
+        for line in stream:
+            # пустые ячейки в конце строки сохраняются, чтобы проверка ширины их заметила
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+
+            row = line.split(config.TAB_LITERAL)
+            if codes is None:
+                width = len(row)
+                codes = np.empty((LOAD_CHUNK_ROWS, width), dtype=np.uint8)
+            elif len(row) != width:
+                raise ValueError(f'map row {height + 1} has {len(row)} cells, expected {width}')
+
+            if height == len(codes):
+                grown = np.empty((len(codes) * 2, width), dtype=np.uint8)
+                grown[:height] = codes
+                codes = grown
+
+            for name in row:
+                if name not in by_name:
+                    by_name[name] = surfaces.code_of(surfaces.from_name(name))
+            codes[height] = [by_name[name] for name in row]
+
+            height += 1
+            self.load_progress.notify(height)
+            yield height
+
+        if codes is None:
+            codes = np.empty((0, 0), dtype=np.uint8)
+        elif height < len(codes):
+            codes = codes[:height].copy()
+
+        self._allocate(width, height, codes)
 
-        for y, line in enumerate(lines):
-            for x, cell_name in enumerate(line.split(config.TAB_LITERAL)):
-                name, id_ = cell_name.strip().split(config.SURFACE_NAME_DELIMITER)
-                surface = surfaces.BY_RESOURCE_NAME[name]
-                surface.id = int(id_)
+    def dump(self, stream: io.TextIOBase):
+        for row in self.dump_rows():
+            stream.write(row)
 
-                self._matrix[y][x] = Cell(surface, Coordinate(x, y))
+    def dump_rows(self) -> Iterator[str]:
+        names = [config.SURFACE_NAME_TEMPLATE.format(i.name, i.id) for i in surfaces.PALETTE]
+        for row in self._surface_codes:
+            yield config.TAB_LITERAL.join(names[code] for code in row.tolist()) + config.NL_LITERAL
 
-    def dump(self, stream: io.TextIOBase):
-        for y in range(self.height):
-            stream.write(config.TAB_LITERAL.join(
-                config.SURFACE_NAME_TEMPLATE.format(i.surface.name, i.surface.id) for i in self._matrix[y]))
+    def _allocate(self, width: int, height: int, surface_codes: Optional[np.ndarray] = None):
+        self._width = width
+        self._height = height
 
-            stream.write(config.NL_LITERAL)
+        if surface_codes is None:
+            surface_codes = np.full((height, width), surfaces.code_of(surfaces.empty), dtype=np.uint8)
+        self._surface_codes = surface_codes
+        # основание -> [Footprint, маска опорных точек, изменившаяся область или None]
+        self._fits: Dict[Tuple[Tuple[int, int], ...], list] = {}
+        self.structures: Layer[Structure] = Layer(width, height)
+        self.units: Layer[Unit] = Layer(width, height)
+        self.items: Layer[Item] = Layer(width, height)
+        self.unit_index = UnitIndex(self.units, config.UNIT_INDEX_BUCKET_CELLS)
+        self.reservations = ReservationTable()
+        for name, layer in (('structures', self.structures), ('units', self.units), ('items', self.items)):
+            layer.placed.subscribe(functools.partial(self._on_layer_changed, name, True))
+            layer.removed.subscribe(functools.partial(self._on_layer_changed, name, False))
+
+        # слои обновляются по событиям клеток, потребители получают их без копирования
+        self._passability = np.zeros((height, width), dtype=bool)
+        self._traversability = np.zeros((height, width), dtype=bool)
+        self._buildability = np.zeros((height, width), dtype=bool)
+
+        self._surface_codes_view = self._read_only(self._surface_codes)
+        self._passability_view = self._read_only(self._passability)
+        self._traversability_view = self._read_only(self._traversability)
+        self._buildability_view = self._read_only(self._buildability)
+
+        self._update_layers()
+
+    def _update_layers(self):
+        # полный пересчёт, пока на поле нет ни строений, ни юнитов, ни предметов
+        passable = np.array([i.passable for i in surfaces.PALETTE], dtype=bool)
+        hard = np.array([i.type == surfaces.Type.hard for i in surfaces.PALETTE], dtype=bool)
+
+        self._traversability[...] = passable[self._surface_codes]
+        self._passability[...] = self._traversability
+        self._buildability[...] = hard[self._surface_codes]
+
+    def _on_layer_changed(self, name: str, placed: bool, x: int, y: int, item):
+        self._update_cell(x, y)
+        # вне batch каждое изменение отправляется сразу, если на changed кто-то подписан
+        if (diff := self._diff) is None:
+            if not self.changed.listener_count:
+                return
+            diff = FieldDiff()
+
+        (diff.placed if placed else diff.removed).append((name, x, y, item))
+        if diff is not self._diff:
+            self.changed.notify(diff)
+
+    def _update_cell(self, x: int, y: int):
+        surface = self.surface_at(x, y)
+        structure = self.structures.get(x, y)
+
+        self._traversability[y, x] = traversable = (surface.passable
+                                                    and (structure is None or not structure.passable))
+        self._passability[y, x] = traversable and self.units.is_empty(x, y)
+        buildable = (surface.type == surfaces.Type.hard
+                     and structure is None
+                     and self.items.is_empty(x, y)
+                     and self.units.is_empty(x, y))
+        if buildable != self._buildability.item(y, x):
+            self._buildability[y, x] = buildable
+            for entry in self._fits.values():
+                dirty = entry[2]
+                entry[2] = (x, y, x, y) if dirty is None else (min(dirty[0], x), min(dirty[1], y),
+                                                               max(dirty[2], x), max(dirty[3], y))
+
+    def _refit(self, entry: list, bounds: Tuple[int, int, int, int]):
+        footprint, mask, _ = entry
+        left, top, right, bottom = bounds
+        left, top, fit = footprint.fit(self._buildability, left - footprint.right, top - footprint.bottom,
+                                       right - footprint.left, bottom - footprint.top)
+        mask[top:top + fit.shape[0], left:left + fit.shape[1]] = fit
+        entry[2] = None
 
     @staticmethod
-    def _create_empty_matrix(width: int, height: int) -> List[List]:
-        return [[Cell(surfaces.empty, Coordinate(i, j)) for i in range(width)] for j in range(height)]
+    def _read_only(layer: np.ndarray) -> np.ndarray:
+        view = layer.view()
+        view.flags.writeable = False
+        return view
@@ -6,6 +6,8 @@ from typing import Dict, Tuple, Optional, Hashable
 from PySide2.QtCore import QSize, QLineF, QRectF
 from PySide2.QtGui import QPixmap, QPainter, Qt, QPicture, QColor, QBrush
 
+import atlas
+import rastercache
 import resources as rc
 from core import Directions
 
@@ -191,14 +193,20 @@ class Path(Overlay):
 #     def boundingRectFor(self, rect: QRectF):
 #         return rect
 
+def atlas_region(resource: Names, width: int, height: int) -> Optional[atlas.Region]:
+    return atlas.shared().get(('overlay', resource, width, height),
+                              lambda: rastercache.rasterize(rc.get_overlay(resource.name), height, width))
+
+
 class Pixmap(Overlay):
 
     def __init__(self, resource: Names, size: QSize, order: PaintOrder, lifetime=IMMORTAL):
         super().__init__(order, lifetime)
         self._name = resource
+        width, height = round(size.width()), round(size.height())
 
-        self._sprite = QPixmap(rc.get_overlay(
-            resource.name)).scaled(size.width(), size.height(), mode=Qt.SmoothTransformation)
+        self._region = atlas_region(resource, width, height) if atlas.enabled() else None
+        self._sprite = None if self._region else rastercache.load(rc.get_overlay(resource.name), height, width)
 
     @property
     def id(self) -> Hashable:
@@ -206,13 +214,18 @@ class Pixmap(Overlay):
 
     @property
     def sprite(self) -> QPixmap:
+        if self._sprite is None:
+            self._sprite = self._region.pixmap.copy(self._region.rect)
         return self._sprite
 
     def draw(self, painter: QPainter, x: int = 0, y: int = 0) -> bool:
         result = False
 
         if self._lifetime == IMMORTAL or self._lifetime > 0:
-            painter.drawPixmap(x, y, self.sprite)
+            if self._region:
+                self._region.draw(painter, QRectF(x, y, self._region.rect.width(), self._region.rect.height()))
+            else:
+                painter.drawPixmap(x, y, self.sprite)
             result = True
 
             if self._lifetime != IMMORTAL:
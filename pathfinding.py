@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import heapq
+from typing import Callable, Optional, List, Dict, Tuple
+
+import numpy as np
+
+from core import Coordinate, Directions
+
+# (направление, смещение по x, смещение по y)
+STEPS: Tuple[Tuple[Directions, int, int], ...] = tuple((d, d.value.x, d.value.y) for d in Directions)
+
+
+def manhattan(start: Coordinate, finish: Coordinate) -> int:
+    return abs(start.x - finish.x) + abs(start.y - finish.y)
+
+
+def find_path(start: Coordinate, finish: Coordinate, width: int, height: int,
+              passable: Callable[[int, int], bool]) -> Optional[List[Directions]]:
+    if not (0 <= finish.x < width and 0 <= finish.y < height):
+        return None
+
+    if start.equals(finish):
+        return []
+
+    finish_x, finish_y = finish.x, finish.y
+    origin = start.y * width + start.x
+    goal = finish_y * width + finish_x
+
+    costs: Dict[int, int] = {origin: 0}
+    came_from: Dict[int, Directions] = {}
+    # (f, -g, индекс клетки): при равном f раскрываются клетки ближе к цели
+    queue = [(manhattan(start, finish), 0, origin)]
+
+    while queue:
+        _, cost, index = heapq.heappop(queue)
+        cost = -cost
+        if cost > costs[index]:
+            continue
+
+        y, x = divmod(index, width)
+        cost += 1
+        for direction, dx, dy in STEPS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+
+            neighbour = ny * width + nx
+            if neighbour == goal:
+                # в конечную точку можно войти, даже если она занята
+                came_from[goal] = direction
+                return _reconstruct(came_from, origin, goal, width)
+
+            if cost < costs.get(neighbour, cost + 1) and passable(nx, ny):
+                costs[neighbour] = cost
+                came_from[neighbour] = direction
+                heuristic = abs(nx - finish_x) + abs(ny - finish_y)
+                heapq.heappush(queue, (cost + heuristic, -cost, neighbour))
+
+    return None
+
+
+def _reconstruct(came_from: Dict[int, Directions], origin: int, goal: int, width: int) -> List[Directions]:
+    result = []
+    index = goal
+    while index != origin:
+        direction = came_from[index]
+        result.append(direction)
+        index -= direction.value.y * width + direction.value.x
+
+    result.reverse()
+    return result
+
+
+class FlowField:
+    UNREACHABLE = np.iinfo(np.int32).max
+
+    def __init__(self, target: Coordinate, traversable: np.ndarray):
+        self._height, self._width = traversable.shape
+        self._target = target
+        self._distances = self._spread(target, traversable)
+        self._directions = self._point(self._distances)
+
+    @property
+    def target(self) -> Coordinate:
+        return self._target
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @property
+    def distances(self) -> np.ndarray:
+        # расстояния в шагах до цели, UNREACHABLE для недостижимых клеток
+        return self._distances[1:-1, 1:-1]
+
+    def contains(self, position: Coordinate) -> bool:
+        return 0 <= position.x < self._width and 0 <= position.y < self._height
+
+    def distance(self, position: Coordinate) -> Optional[int]:
+        if self.contains(position):
+            distance = int(self._distances[position.y + 1, position.x + 1])
+            if distance != self.UNREACHABLE:
+                return distance
+        return None
+
+    def direction(self, position: Coordinate) -> Optional[Directions]:
+        if self.contains(position):
+            code = self._directions[position.y, position.x]
+            if code >= 0:
+                return STEPS[code][0]
+        return None
+
+    def route(self, position: Coordinate) -> Optional[List[Directions]]:
+        if not position.equals(self._target) and self.direction(position) is None:
+            return None
+
+        result = []
+        while not position.equals(self._target):
+            direction = self.direction(position)
+            result.append(direction)
+            position = position + direction.value
+        return result
+
+    @classmethod
+    def _spread(cls, target: Coordinate, traversable: np.ndarray) -> np.ndarray:
+        # волна от цели по всем клеткам сразу; сетка дополнена непроходимой рамкой,
+        # чтобы соседей можно было брать по смещению в плоском массиве без проверки границ
+        height, width = traversable.shape
+        open_ = np.zeros((height + 2, width + 2), dtype=bool)
+        open_[1:-1, 1:-1] = traversable
+        open_ = open_.ravel()
+
+        distances = np.full(open_.shape, cls.UNREACHABLE, dtype=np.int32)
+        offsets = np.array([dy * (width + 2) + dx for _, dx, dy in STEPS])
+
+        frontier = np.array([(target.y + 1) * (width + 2) + target.x + 1])
+        if 0 <= target.x < width and 0 <= target.y < height:
+            distances[frontier] = 0
+            open_[frontier] = False
+        else:
+            frontier = frontier[:0]
+
+        distance = 0
+        while frontier.size:
+            distance += 1
+            neighbours = (frontier[:, None] + offsets).ravel()
+            frontier = np.unique(neighbours[open_[neighbours]])
+            open_[frontier] = False
+            distances[frontier] = distance
+
+        return distances.reshape(height + 2, width + 2)
+
+    @classmethod
+    def _point(cls, distances: np.ndarray) -> np.ndarray:
+        height, width = distances.shape[0] - 2, distances.shape[1] - 2
+        around = np.stack([distances[1 + dy:height + 1 + dy, 1 + dx:width + 1 + dx] for _, dx, dy in STEPS])
+
+        result = np.argmin(around, axis=0).astype(np.int8)
+        result[np.min(around, axis=0) == cls.UNREACHABLE] = -1
+        return result
@@ -0,0 +1,104 @@
+import argparse
+import glob
+import hashlib
+import os
+import sys
+from typing import Optional, Dict, Tuple, Iterable
+
+from PySide2.QtCore import Qt, qVersion
+from PySide2.QtGui import QImage, QPainter, QPixmap, QGuiApplication
+from PySide2.QtSvg import QSvgRenderer
+
+import config
+
+# (путь, время изменения, размер файла) -> хэш содержимого
+_digests: Dict[Tuple[str, float, int], str] = {}
+
+
+def source_digest(source: str) -> str:
+    stat = os.stat(source)
+    key = (source, stat.st_mtime, stat.st_size)
+    if (digest := _digests.get(key)) is None:
+        with open(source, 'rb') as fo:
+            digest = _digests[key] = hashlib.sha1(fo.read()).hexdigest()
+    return digest
+
+
+def cache_path(source: str, height: int, width: Optional[int] = None) -> str:
+    # ключ меняется вместе с содержимым файла, поэтому устаревшие картинки просто не находятся
+    key = f'{source_digest(source)}:{width or "auto"}x{height}:{qVersion()}'
+    return os.path.join(config.RASTER_CACHE_PATH, hashlib.sha1(key.encode()).hexdigest() + '.png')
+
+
+def render(source: str, height: int, width: Optional[int] = None) -> QImage:
+    renderer = QSvgRenderer(source)
+    if not renderer.isValid():
+        raise ValueError(f'can not render "{source}"')
+
+    if width is None:
+        default = renderer.defaultSize()
+        width = max(1, round(default.width() * height / default.height()))
+
+    image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    painter.setRenderHint(QPainter.SmoothPixmapTransform)
+    renderer.render(painter)
+    painter.end()
+
+    return image
+
+
+def rasterize(source: str, height: int, width: Optional[int] = None) -> QImage:
+    path = cache_path(source, height, width)
+    image = QImage()
+    if os.path.isfile(path) and image.load(path):
+        return image
+
+    image = render(source, height, width)
+    os.makedirs(config.RASTER_CACHE_PATH, exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    if image.save(temporary, 'PNG'):
+        os.replace(temporary, path)
+
+    return image
+
+
+def load(source: str, height: int, width: Optional[int] = None) -> QPixmap:
+    return QPixmap.fromImage(rasterize(source, height, width))
+
+
+def warm(sizes: Iterable[int]) -> int:
+    count = 0
+    tiles = glob.glob(os.path.join(config.TILES_PATH, '*.svg'))
+    overlays = glob.glob(os.path.join(config.OVERLAYS_PATH, '*.svg'))
+
+    for size in sizes:
+        for source in tiles:
+            rasterize(os.path.normpath(source), size)
+            count += 1
+        for source in overlays:
+            rasterize(os.path.normpath(source), size, size)
+            count += 1
+    return count
+
+
+def main(argv):
+    default_sizes = sorted({max(1, round(config.DEFAULT_SQUARE_SIZE * i)) for i in config.LOD_SCALES})
+
+    parser = argparse.ArgumentParser(description='rasterized SVG cache')
+    parser.add_argument('command', choices=('warm', 'clear'))
+    parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes)
+    args = parser.parse_args(argv[1:])
+
+    if args.command == 'warm':
+        app = QGuiApplication(argv)
+        print(f'{warm(args.sizes)} images cached in {config.RASTER_CACHE_PATH}')
+    else:
+        for path in glob.glob(os.path.join(config.RASTER_CACHE_PATH, '*.png')):
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
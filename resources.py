@@ -12,6 +12,8 @@ PASSABLE_CURSOR_COLOR = QColor(100, 200, 100, 50)
 IMPASSABLE_CURSOR_COLOR = QColor(150, 150, 150, 50)
 PATH_PEN = QPen(QColor(255, 255, 255, 100), 10, Qt.SolidLine)
 RUBBER_BAND_BRUSH = QBrush(QColor(100, 100, 100))
+TELEMETRY_BACKGROUND_COLOR = QColor(0, 0, 0, 150)
+TELEMETRY_TEXT_COLOR = QColor(220, 220, 220)
 
 
 def get_resource(path: str) -> str:
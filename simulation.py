@@ -0,0 +1,81 @@
+import heapq
+import itertools
+import math
+from typing import Dict, List, Tuple, Optional
+
+import config
+import models
+from core import Event, dispatch_deferred
+
+
+def move_duration(unit: models.Unit, speed: Optional[models.Speed] = None) -> int:
+    return math.ceil(config.DEFAULT_MOVE_ANIMATION_SPEED / (speed or unit.speed).value)
+
+
+def turn_duration(unit: models.Unit, speed: Optional[models.Speed] = None) -> int:
+    return math.ceil(config.DEFAULT_TURN_ANIMATION_SPEED / (speed or unit.speed).value)
+
+
+class Simulation:
+    def __init__(self, tick_duration: int = config.SIMULATION_TICK):
+        self._tick_duration = tick_duration
+        self._tick = 0
+        self._actions: Dict[models.Unit, Event] = {}
+        # (такт окончания, порядковый номер, юнит)
+        self._schedule: List[Tuple[int, int, models.Unit]] = []
+        self._order = itertools.count()
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    @property
+    def tick_duration(self) -> int:
+        return self._tick_duration
+
+    @property
+    def time(self) -> int:
+        return self._tick * self._tick_duration
+
+    def ticks(self, duration: int) -> int:
+        return max(1, math.ceil(duration / self._tick_duration))
+
+    def track(self, unit: models.Unit) -> Event:
+        # событие срабатывает, когда юнит закончил поворот или шаг
+        if (action_ended := self._actions.get(unit)) is None:
+            action_ended = self._actions[unit] = Event()
+            unit.moved.subscribe(lambda direction: self._schedule_action(unit, move_duration(unit)))
+            unit.turned.subscribe(lambda previous, direction: self._schedule_action(unit, turn_duration(unit)))
+        return action_ended
+
+    def wait(self, unit: models.Unit, ticks: int):
+        # ожидание на месте тоже заканчивается событием action_ended
+        self.track(unit)
+        heapq.heappush(self._schedule, (self._tick + max(1, ticks), next(self._order), unit))
+
+    def is_idle(self) -> bool:
+        return not self._schedule
+
+    def step(self):
+        self.run(1)
+
+    def run(self, ticks: int):
+        # пустые такты пропускаются, время сразу переходит к ближайшему окончанию действия
+        target = self._tick + ticks
+        while self._schedule and self._schedule[0][0] <= target:
+            self._tick = self._schedule[0][0]
+            while self._schedule and self._schedule[0][0] == self._tick:
+                _, _, unit = heapq.heappop(self._schedule)
+                self._actions[unit].notify()
+            dispatch_deferred()
+        self._tick = target
+        dispatch_deferred()
+
+    def run_until_idle(self, limit: int) -> int:
+        start = self._tick
+        while self._schedule and self._schedule[0][0] - start <= limit:
+            self.run(self._schedule[0][0] - self._tick)
+        return self._tick - start
+
+    def _schedule_action(self, unit: models.Unit, duration: int):
+        heapq.heappush(self._schedule, (self._tick + self.ticks(duration), next(self._order), unit))
@@ -1,6 +1,11 @@
+import dataclasses
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict
+from typing import Dict, List, Tuple
+
+import config
+
+MAX_CODES = 256  # код клетки занимает один байт
 
 
 class Type(Enum):
@@ -8,7 +13,7 @@ class Type(Enum):
     hard = 2
 
 
-@dataclass(eq=True)
+@dataclass(eq=True, frozen=True)
 class Surface:
     name: str
     resource: str
@@ -30,3 +35,41 @@ BY_RESOURCE_NAME: Dict[str, Surface] = {
     sand.resource: sand,
     dune.resource: dune,
     rock.resource: rock}
+
+# общая палитра: каждый вариант поверхности существует в единственном экземпляре
+PALETTE: List[Surface] = []
+_CODES: Dict[Tuple[str, int], int] = {}
+
+
+def code_of(surface: Surface) -> int:
+    key = (surface.resource, surface.id)
+    code = _CODES.get(key)
+    if code is None:
+        if len(PALETTE) >= MAX_CODES:
+            raise ValueError(f'surface palette is full, can not add {surface}')
+
+        code = len(PALETTE)
+        PALETTE.append(surface)
+        _CODES[key] = code
+    return code
+
+
+def by_code(code: int) -> Surface:
+    return PALETTE[code]
+
+
+def get(resource: str, variant: int = 1) -> Surface:
+    code = _CODES.get((resource, variant))
+    if code is None:
+        code = code_of(dataclasses.replace(BY_RESOURCE_NAME[resource], id=variant))
+    return PALETTE[code]
+
+
+def from_name(name: str) -> Surface:
+    # имя без номера варианта (старый формат карт) соответствует первому варианту
+    resource, _, id_ = name.strip().partition(config.SURFACE_NAME_DELIMITER)
+    return get(resource, int(id_) if id_ else 1)
+
+
+for _surface in BY_RESOURCE_NAME.values():
+    code_of(_surface)
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# без дисплея: окна через offscreen, OpenGL через программный Mesa
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('LIBGL_ALWAYS_SOFTWARE', '1')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def application():
+    from PySide2.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,138 @@
+import os
+from typing import Callable
+
+import numpy as np
+import pytest
+
+from PySide2.QtCore import Qt, QSize
+from PySide2.QtGui import QImage, QPainter
+
+import atlas
+import config
+import graphics
+import overlays
+from core import Directions, UnitState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZE = 32
+RESOURCE = 'red17'
+# допустимое расхождение канала цвета после выборки из текстуры
+TOLERANCE = 2
+
+Draw = Callable[[QPainter], None]
+
+
+@pytest.fixture
+def resources(application, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'SPRITES_PATH', os.path.join(ROOT, 'resource', 'sprites'))
+    monkeypatch.setattr(config, 'OVERLAYS_PATH', os.path.join(ROOT, 'resource', 'overlays'))
+    monkeypatch.setattr(config, 'RASTER_CACHE_PATH', str(tmp_path))
+    monkeypatch.setattr(atlas, '_shared', atlas.Atlas(1024))
+    monkeypatch.setattr(atlas, '_enabled', False)
+    graphics.sprite_sheets.clear()
+
+
+@pytest.fixture
+def packed(resources, monkeypatch):
+    monkeypatch.setattr(atlas, '_enabled', True)
+    graphics.build_atlas([RESOURCE], SIZE)
+
+
+def scene() -> Draw:
+    # курсор и первый кадр юнита рядом; из атласа, если он включён
+    cursor = overlays.Pixmap(overlays.Names.cursor_selected, QSize(SIZE, SIZE), overlays.PaintOrder.post)
+    animation = graphics.FrameAnimation.load(RESOURCE, UnitState.move, None, Directions.east, 10, SIZE)
+
+    def draw(painter: QPainter):
+        cursor.draw(painter)
+        painter.translate(SIZE, 0)
+        animation.draw(painter)
+
+    return draw
+
+
+def paint(draw: Draw, painter: QPainter):
+    # framebuffer виджета без альфа-канала, поэтому фон непрозрачный
+    painter.fillRect(0, 0, SIZE * 2, SIZE, Qt.darkGray)
+    draw(painter)
+    painter.end()
+
+
+def render_raster(draw: Draw) -> QImage:
+    image = QImage(SIZE * 2, SIZE, QImage.Format_ARGB32_Premultiplied)
+    paint(draw, QPainter(image))
+    return image
+
+
+def render_gl(draw: Draw) -> QImage:
+    # с платформой offscreen контекста нет и тест пропускается; без дисплея OpenGL даёт программный Mesa:
+    # QT_QPA_PLATFORM=eglfs QT_QPA_EGLFS_INTEGRATION=none QT_QPA_EGLFS_FB=/dev/zero EGL_PLATFORM=surfaceless
+    # LIBGL_ALWAYS_SOFTWARE=1 python -m pytest tests/test_atlas.py
+    from PySide2.QtGui import QOpenGLContext
+    from PySide2.QtWidgets import QOpenGLWidget
+
+    if not QOpenGLContext().create():
+        pytest.skip('no OpenGL context')
+
+    class Target(QOpenGLWidget):
+        def paintGL(self):
+            paint(draw, QPainter(self))
+
+    # скрытый виджет рисует в собственный framebuffer, окно для этого не нужно
+    target = Target()
+    target.resize(SIZE * 2, SIZE)
+    image = target.grabFramebuffer()
+    target.deleteLater()
+    return image
+
+
+def pixels(image: QImage) -> np.ndarray:
+    image = image.convertToFormat(QImage.Format_ARGB32)
+    data = np.frombuffer(image.constBits(), dtype=np.uint8, count=image.sizeInBytes())
+    return data.reshape(image.height(), image.bytesPerLine())[:, :image.width() * 4].astype(int)
+
+
+def assert_similar(actual: QImage, expected: QImage, tolerance: int = 0):
+    assert actual.size() == expected.size()
+    difference = np.abs(pixels(actual) - pixels(expected))
+    assert difference.max() <= tolerance, difference.max()
+
+
+def test_build_freezes_atlas(packed):
+    shared = atlas.shared()
+    assert shared.frozen
+    keys = [page.cacheKey() for page in map(shared.page, range(shared.page_count))]
+    loaded = []
+
+    # во время игры страницы не меняются и заново не загружаются
+    assert shared.get(('overlay', 'other'), lambda: loaded.append(1)) is None
+    with pytest.raises(ValueError):
+        shared.add(('overlay', 'other'), QImage(SIZE, SIZE, QImage.Format_ARGB32_Premultiplied))
+    assert not loaded
+    assert [page.cacheKey() for page in map(shared.page, range(shared.page_count))] == keys
+
+
+def test_unpacked_sizes_fall_back(packed):
+    count = len(atlas.shared())
+    cursor = overlays.Pixmap(overlays.Names.cursor_move, QSize(SIZE * 2, SIZE * 2), overlays.PaintOrder.post)
+    assert cursor.sprite.size() == QSize(SIZE * 2, SIZE * 2)
+    assert graphics.atlas_frames(RESOURCE, UnitState.move, None, Directions.east, SIZE * 2) is None
+    assert len(atlas.shared()) == count
+
+
+def test_raster_atlas_matches_sprites(packed, monkeypatch):
+    expected = render_raster(scene())
+    monkeypatch.setattr(atlas, '_enabled', False)
+    assert_similar(render_raster(scene()), expected)
+
+
+def test_gl_atlas_matches_sprites(resources, monkeypatch):
+    expected = render_raster(scene())
+    unpacked = render_gl(scene())
+
+    monkeypatch.setattr(atlas, '_enabled', True)
+    graphics.build_atlas([RESOURCE], SIZE)
+    packed = render_gl(scene())
+
+    assert_similar(packed, unpacked, TOLERANCE)
+    assert_similar(packed, expected, TOLERANCE)
@@ -0,0 +1,72 @@
+import io
+import mmap
+import os
+
+import numpy as np
+import pytest
+
+import binmap
+import models
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAPS = [os.path.join(ROOT, 'maps', name) for name in ('test.txt', 'test2.txt')]
+
+
+def load_text(path: str) -> models.Field:
+    field = models.Field(1, 1)
+    with open(path) as fi:
+        field.load(fi)
+    return field
+
+
+def dump_text(field: models.Field) -> str:
+    stream = io.StringIO()
+    field.dump(stream)
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize('path', MAPS, ids=os.path.basename)
+def test_dump_load_round_trip(path, tmp_path):
+    field = load_text(path)
+    destination = tmp_path / 'map.bin'
+    with open(destination, 'wb') as fo:
+        binmap.dump(field, fo)
+
+    loaded = binmap.load(str(destination))
+    assert (loaded.width, loaded.height) == (field.width, field.height)
+    assert np.array_equal(loaded.surface_codes, field.surface_codes)
+    assert np.array_equal(loaded.passability, field.passability)
+
+
+def test_load_does_not_copy_codes(tmp_path):
+    destination = tmp_path / 'map.bin'
+    with open(destination, 'wb') as fo:
+        binmap.dump(load_text(MAPS[1]), fo)
+
+    codes = binmap.load(str(destination)).surface_codes
+    base = codes
+    while isinstance(base, np.ndarray):
+        base = base.base
+    # массив смотрит в отображённый файл через буфер mmap
+    assert isinstance(base, memoryview) and isinstance(base.obj, mmap.mmap)
+
+
+def test_load_rejects_other_code_sizes(tmp_path):
+    destination = tmp_path / 'map.bin'
+    with open(destination, 'wb') as fo:
+        fo.write(binmap.HEADER.pack(binmap.MAGIC, binmap.VERSION, 2, 1, 1, 0))
+        fo.write(bytes(8))
+
+    with pytest.raises(ValueError, match='code size'):
+        binmap.load(str(destination))
+
+
+@pytest.mark.parametrize('path', MAPS, ids=os.path.basename)
+def test_text_binary_text_round_trip(path, tmp_path):
+    binary = str(tmp_path / 'map.bin')
+    text = str(tmp_path / 'map.txt')
+    binmap.text_to_binary(path, binary)
+    binmap.binary_to_text(binary, text)
+
+    with open(text) as fi:
+        assert fi.read() == dump_text(load_text(path))
@@ -0,0 +1,128 @@
+from typing import List
+
+import numpy as np
+
+import commands
+import config
+import cooperative
+import models
+import simulation
+import surfaces
+from core import Coordinate
+
+SAND = surfaces.code_of(surfaces.sand)
+ROCK = surfaces.code_of(surfaces.rock)
+DUNE = surfaces.code_of(surfaces.dune)
+SECOND = 1000  # ms
+
+
+def make_field(codes: np.ndarray) -> models.Field:
+    field = models.Field(1, 1)
+    field.assign(codes, list(surfaces.PALETTE))
+    return field
+
+
+class CountingPlanner(cooperative.Planner):
+    plans = 0
+
+    def plan(self, unit, destination):
+        self.plans += 1
+        return super().plan(unit, destination)
+
+
+def test_blocked_corridor_gives_up():
+    # коридор шириной в клетку перекрыт стоящим юнитом
+    codes = np.full((3, 12), ROCK, dtype=np.uint8)
+    codes[1] = SAND
+    field = make_field(codes)
+    models.Unit('parked', field, Coordinate(6, 1))
+
+    game = simulation.Simulation()
+    planner = CountingPlanner(field, game)
+    unit = models.Unit('mover', field, Coordinate(0, 1))
+    command = commands.UnitMove(unit, Coordinate(11, 1), game.track(unit), planner)
+    failed, finished = [], []
+    command.failed.subscribe(lambda: failed.append(game.time))
+    command.finished.subscribe(lambda: finished.append(game.time))
+    command.execute()
+
+    game.run(game.ticks(1000 * SECOND))
+    assert failed and finished
+    assert game.is_idle()
+    assert unit.position.equals(Coordinate(5, 1))
+    assert planner.plans < 50
+
+
+def run_group(destinations: List[Coordinate]):
+    field = make_field(np.full((12, 30), SAND, dtype=np.uint8))
+    game = simulation.Simulation()
+    planner = CountingPlanner(field, game)
+    starts = [Coordinate(x, y) for x in range(3) for y in range(1, 11)]
+
+    units = [models.Unit('group', field, position) for position in starts]
+    finished = []
+    for unit, destination in zip(units, destinations):
+        command = commands.UnitMove(unit, destination, game.track(unit), planner)
+        command.finished.subscribe(lambda unit=unit: finished.append(unit))
+        command.execute()
+
+    game.run(game.ticks(600 * SECOND))
+    assert game.is_idle()
+    assert len(finished) == len(units)
+    return units, planner
+
+
+def test_group_to_one_cell_spreads_around_it():
+    goal = Coordinate(24, 5)
+    units, planner = run_group([goal] * 30)
+    # 30 клеток помещаются в ромб радиуса 4 вокруг цели
+    assert max(abs(unit.x - goal.x) + abs(unit.y - goal.y) for unit in units) <= 4
+    assert sum(unit.position.equals(goal) for unit in units) == 1
+    assert planner.plans < 30 * 50
+
+
+def test_group_to_goal_block_settles():
+    block = [Coordinate(x, y) for x in range(22, 27) for y in range(3, 9)]
+    units, planner = run_group(block)
+    arrived = sum(unit.position.equals(destination) for unit, destination in zip(units, block))
+    assert arrived >= 10
+    assert all(21 <= unit.x <= 27 and 2 <= unit.y <= 9 for unit in units)
+    assert planner.plans < 30 * 50
+
+
+def test_bookings_follow_terrain_speed():
+    # поворот и шаги по дюнам медленнее, брони должны покрывать их настоящую длительность
+    codes = np.full((4, 4), ROCK, dtype=np.uint8)
+    codes[1, :3] = [SAND, DUNE, DUNE]
+    codes[2:, 2] = [DUNE, SAND]
+    field = make_field(codes)
+    game = simulation.Simulation()
+    planner = cooperative.Planner(field, game)
+    unit = models.Unit('mover', field, Coordinate(0, 1))
+
+    table = field.reservations
+    checked = []
+
+    def check(duration: int):
+        # клетка юнита забронирована на всё время поворота или шага
+        assert table.owner_at(unit.x, unit.y, game.tick) is unit
+        assert table.owner_at(unit.x, unit.y, game.tick + game.ticks(duration) - 1) is unit
+        checked.append(duration)
+
+    unit.turned.subscribe(lambda previous, direction: check(simulation.turn_duration(unit)))
+    unit.moved.subscribe(lambda direction: check(simulation.move_duration(unit)))
+
+    commands.UnitMove(unit, Coordinate(2, 3), game.track(unit), planner).execute()
+    game.run_until_idle(game.ticks(60 * SECOND))
+    assert unit.position.equals(Coordinate(2, 3))
+    assert len(checked) == 5
+
+
+def test_flow_fields_are_bounded():
+    field = make_field(np.full((8, 8), SAND, dtype=np.uint8))
+    planner = cooperative.Planner(field, simulation.Simulation())
+    unit = models.Unit('mover', field, Coordinate(0, 0))
+    for y in range(8):
+        for x in range(1, 8):
+            planner.plan(unit, Coordinate(x, y))
+    assert len(planner._flow_fields) == config.COOPERATIVE_FLOW_FIELD_CACHE_SIZE
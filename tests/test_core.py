@@ -0,0 +1,91 @@
+import os
+
+import core
+import models
+from core import Coordinate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_route_calculated_is_synchronous():
+    field = models.Field(1, 1)
+    with open(os.path.join(ROOT, 'maps', 'test.txt')) as fi:
+        field.load(fi)
+
+    unit = models.Unit('test', field, Coordinate(1, 1))
+    routes = []
+    unit.route_calculated.subscribe(lambda start, finish, route: routes.append(list(route)))
+
+    route = unit.generate_path(Coordinate(4, 3))
+    assert routes == [route]
+    assert unit.route_calculated not in core._pending_events
+
+
+def test_deferred_event_waits_for_dispatch():
+    event = core.Event(deferred=True)
+    calls = []
+    event.subscribe(calls.append)
+
+    event.notify(1)
+    event.notify(2)
+    assert calls == []
+
+    core.dispatch_deferred()
+    assert calls == [2]
+    assert event not in core._pending_events
+
+
+def test_builtin_method_keeps_identity():
+    # list.append создаётся заново при каждом обращении и не имеет __func__
+    event = core.Event()
+    calls = []
+    event.subscribe(calls.append)
+    event.subscribe(calls.append)
+    assert event.listener_count == 1
+
+    event.notify(1)
+    assert calls == [1]
+    assert event.unsubscribe(calls.append)
+    assert event.listener_count == 0
+
+    event.notify(2)
+    assert calls == [1]
+
+
+def test_bound_methods_of_equal_objects_are_distinct():
+    class Listener(list):
+        def on_event(self, value):
+            self.append(value)
+
+    event = core.Event()
+    first, second = Listener(), Listener()
+    event.subscribe(first.on_event)
+    event.subscribe(second.on_event)
+    event.subscribe(first.append)
+    event.subscribe(second.append)
+    assert event.listener_count == 4
+
+    event.notify(1)
+    assert first == second == [1, 1]
+    assert event.unsubscribe(second.append) and event.unsubscribe(second.on_event)
+    event.notify(2)
+    assert (first, second) == ([1, 1, 2, 2], [1, 1])
+
+
+def test_listeners_change_during_notify():
+    # рассылка идёт по снимку: подписка и отписка вступают в силу со следующего вызова
+    event = core.Event()
+    calls = []
+
+    def late(value):
+        calls.append(('late', value))
+
+    def early(value):
+        calls.append(('early', value))
+        event.unsubscribe(early)
+        event.subscribe(late)
+
+    event.subscribe(early)
+    event.notify(1)
+    event.notify(2)
+    assert calls == [('early', 1), ('late', 2)]
@@ -0,0 +1,53 @@
+import pytest
+from PySide2.QtOpenGL import QGLWidget
+from PySide2.QtWidgets import QGraphicsView, QWidget, QOpenGLWidget
+
+import config
+import graphics
+
+THRESHOLDS = [
+    (0, QGraphicsView.SmartViewportUpdate),
+    (config.SMART_UPDATE_MAX_ANIMATIONS, QGraphicsView.SmartViewportUpdate),
+    (config.SMART_UPDATE_MAX_ANIMATIONS + 1, QGraphicsView.BoundingRectViewportUpdate),
+    (config.BOUNDING_RECT_UPDATE_MAX_ANIMATIONS, QGraphicsView.BoundingRectViewportUpdate),
+    (config.BOUNDING_RECT_UPDATE_MAX_ANIMATIONS + 1, QGraphicsView.FullViewportUpdate),
+]
+
+
+def view_with(viewport: QWidget) -> graphics.AdaptiveUpdateGraphicsView:
+    view = graphics.AdaptiveUpdateGraphicsView()
+    view.setViewport(viewport)
+    return view
+
+
+@pytest.mark.parametrize('animating, mode', THRESHOLDS)
+def test_raster_viewport_update_modes(application, animating, mode):
+    view = view_with(QWidget())
+    assert view.supports_partial_updates()
+    assert view.update_mode_for(animating) == mode
+
+
+# оба OpenGL-вьюпорта Qt 5 перерисовывает целиком при любом обновлении
+@pytest.mark.parametrize('viewport', [QGLWidget, QOpenGLWidget], ids=lambda viewport: viewport.__name__)
+@pytest.mark.parametrize('animating, _', THRESHOLDS)
+def test_gl_viewports_always_update_fully(application, viewport, animating, _):
+    view = view_with(viewport())
+    assert not view.supports_partial_updates()
+    assert view.update_mode_for(animating) == QGraphicsView.FullViewportUpdate
+
+
+def test_game_view_matches_viewport(application):
+    view = graphics.GameGraphicsView()
+    assert view.adaptive_update
+    assert view.supports_partial_updates() == (not config.USE_OPENGL_VIEWPORT)
+    if config.USE_OPENGL_VIEWPORT:
+        assert view.viewportUpdateMode() == QGraphicsView.FullViewportUpdate
+
+
+def test_raster_game_view_adapts(application):
+    # то же построение, что у GameGraphicsView при USE_OPENGL_VIEWPORT = False
+    view_type = type('RasterGameView', (graphics.AdaptiveUpdateGraphicsView, graphics.RasterGraphicsView,
+                                        graphics.UserControlledGraphicsView), {})
+    view = view_type()
+    assert view.supports_partial_updates()
+    assert view.update_mode_for(0) == QGraphicsView.SmartViewportUpdate
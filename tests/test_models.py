@@ -0,0 +1,180 @@
+import io
+import random
+
+import numpy as np
+import pytest
+
+import models
+import surfaces
+from core import Coordinate, Directions
+
+ROWS = ['sand\tdune\trock\n', 'rock\tsand\tsand\r\n', 'dune\tdune\tsand\n']
+
+
+class Pipe(io.StringIO):
+    # поток без перемотки, как стандартный ввод из канала
+    def seekable(self):
+        return False
+
+    def tell(self):
+        raise OSError('stream is not seekable')
+
+    def seek(self, *args):
+        raise OSError('stream is not seekable')
+
+
+def names(field: models.Field) -> list:
+    return [[field.surface_at(x, y).name for x in range(field.width)] for y in range(field.height)]
+
+
+def test_load_reports_progress_per_row():
+    field = models.Field(1, 1)
+    progress = []
+    field.load_progress.subscribe(progress.append)
+    field.load(io.StringIO(''.join(ROWS) + '\n'))
+
+    assert progress == [1, 2, 3]
+    assert (field.width, field.height) == (3, 3)
+    assert names(field) == [['sand', 'dune', 'rock'], ['rock', 'sand', 'sand'], ['dune', 'dune', 'sand']]
+
+
+def test_load_reads_stream_once(monkeypatch):
+    # ёмкость меньше карты: массив растёт по ходу единственного прохода
+    monkeypatch.setattr(models, 'LOAD_CHUNK_ROWS', 1)
+    field = models.Field(1, 1)
+    field.load(Pipe(''.join(ROWS)))
+
+    assert (field.width, field.height) == (3, 3)
+    assert names(field)[2] == ['dune', 'dune', 'sand']
+
+
+@pytest.mark.parametrize('row', ['sand\tsand\n', 'sand\tsand\tsand\tsand\n', 'sand\tsand\tsand\t\n'],
+                         ids=['short', 'long', 'trailing-tab'])
+def test_load_rejects_rows_of_other_width(row):
+    field = models.Field(2, 2)
+    with pytest.raises(ValueError, match='map row 2 has'):
+        field.load(io.StringIO(ROWS[0] + row))
+
+    # при ошибке поле остаётся прежним
+    assert (field.width, field.height) == (2, 2)
+
+
+def test_load_rows_is_lazy():
+    field = models.Field(1, 1)
+    rows = field.load_rows(io.StringIO(''.join(ROWS)))
+    assert next(rows) == 1
+    assert (field.width, field.height) == (1, 1)
+    assert list(rows) == [2, 3]
+    assert field.surface_codes.shape == (3, 3)
+
+
+def unit_field(size: int) -> models.Field:
+    field = models.Field(1, 1)
+    field.assign(np.full((size, size), surfaces.code_of(surfaces.sand), dtype=np.uint8), list(surfaces.PALETTE))
+    return field
+
+
+def test_unit_index_matches_layer():
+    # корзины 4x4 на поле 20x20: области пересекают границы корзин
+    field = unit_field(20)
+    index = models.UnitIndex(field.units, 4)
+    generator = random.Random(1)
+    cells = generator.sample([(x, y) for x in range(20) for y in range(20)], 60)
+    units = [models.Unit('unit', field, Coordinate(x, y)) for x, y in cells]
+    for unit in units[:20]:
+        unit.move(Directions.east) or unit.move(Directions.west)
+
+    assert len(index) == len(field.unit_index) == len(units)
+    for _ in range(50):
+        left, right = sorted(generator.randrange(-2, 22) for _ in range(2))
+        top, bottom = sorted(generator.randrange(-2, 22) for _ in range(2))
+        expected = {unit for unit in units if left <= unit.x <= right and top <= unit.y <= bottom}
+        assert set(index.in_region(left, top, right, bottom)) == expected
+
+    field.units.remove(units[0].x, units[0].y)
+    assert units[0] not in index
+    assert units[0] not in index.in_region(0, 0, 19, 19)
+    assert len(index) == len(units) - 1
+
+
+def test_batch_sends_cell_events_at_once_and_one_diff():
+    field = models.Field(1, 1)
+    field.assign(np.full((6, 6), surfaces.code_of(surfaces.rock), dtype=np.uint8), list(surfaces.PALETTE))
+    sand = surfaces.sand
+    structure = models.Structure('wall', [Coordinate(0, 0), Coordinate(1, 0)], passable=False)
+    events, diffs = [], []
+    field.surface_changed.subscribe(lambda x, y, surface: events.append(('surface', x, y)))
+    field.structures.placed.subscribe(lambda x, y, item: events.append(('placed', x, y)))
+    field.changed.subscribe(diffs.append)
+
+    with field.batch() as diff:
+        field.set_surface(4, 4, sand)
+        with field.batch():
+            assert structure.place(field, Coordinate(1, 1), Directions.east)
+        field.set_surface(5, 4, sand)
+        # поклеточные события уже разосланы, общее изменение ещё нет
+        assert events == [('surface', 4, 4), ('placed', 1, 1), ('placed', 2, 1), ('surface', 5, 4)]
+        assert not diffs
+        assert field.surface_at(4, 4) is sand and not field.at(1, 1).can_build
+
+    assert diffs == [diff]
+    assert diff.surfaces == {(4, 4): sand, (5, 4): sand}
+    assert [(name, x, y) for name, x, y, _ in diff.placed] == [('structures', 1, 1), ('structures', 2, 1)]
+    assert diff.cells == {(4, 4), (5, 4), (1, 1), (2, 1)}
+
+    # вне batch каждое изменение приходит отдельным diff
+    field.set_surface(0, 0, sand)
+    assert events[-1] == ('surface', 0, 0)
+    assert len(diffs) == 2 and diffs[-1].surfaces == {(0, 0): sand}
+
+
+def brute_fit(field: models.Field, footprint: models.Footprint) -> np.ndarray:
+    # опорная точка годится, если каждая клетка основания есть на карте и на ней можно строить
+    result = np.zeros((field.height, field.width), dtype=bool)
+    for y in range(field.height):
+        for x in range(field.width):
+            cells = [field.at(x + dx, y + dy) for dx, dy in footprint.key]
+            result[y, x] = all(cell is not None and cell.can_build for cell in cells)
+    return result
+
+
+FOOTPRINTS = {
+    'rectangle': [Coordinate(x, y) for x in range(3) for y in range(2)],
+    'l-shape': [Coordinate(0, 0), Coordinate(0, 1), Coordinate(0, 2), Coordinate(1, 2)],
+    'offset-cross': [Coordinate(0, -1), Coordinate(-1, 0), Coordinate(0, 0), Coordinate(1, 0), Coordinate(0, 1)],
+}
+
+
+@pytest.mark.parametrize('points', FOOTPRINTS.values(), ids=FOOTPRINTS.keys())
+def test_fit_mask_matches_brute_force(points):
+    generator = np.random.default_rng(7)
+    rock, sand = surfaces.code_of(surfaces.rock), surfaces.code_of(surfaces.sand)
+    codes = np.where(generator.random((24, 30)) < 0.85, rock, sand).astype(np.uint8)
+    field = models.Field(1, 1)
+    field.assign(codes, list(surfaces.PALETTE))
+
+    footprint = models.Footprint(points)
+    assert footprint.rectangular == (len(points) == 6)
+    assert np.array_equal(field.fit_mask(footprint), brute_fit(field, footprint))
+
+    # после каждого строительства и сноса маска пересчитывается только около изменившихся клеток
+    placed = []
+    for _ in range(25):
+        structure = models.Structure('block', points, passable=False)
+        anchors = structure.anchors(field)
+        x, y = anchors[generator.integers(len(anchors))]
+        assert structure.place(field, Coordinate(int(x), int(y)), Directions.east)
+        placed.append(structure)
+        assert np.array_equal(field.fit_mask(footprint), brute_fit(field, footprint))
+
+    for index in generator.permutation(len(placed)):
+        placed[index].destroy(field)
+        assert np.array_equal(field.fit_mask(footprint), brute_fit(field, footprint))
+
+    # юнит и смена поверхности тоже меняют пригодность клеток; новая форма считается по всей карте
+    x, y = np.argwhere(field.buildability)[0][::-1]
+    models.Unit('unit', field, Coordinate(int(x), int(y)))
+    field.set_surface(3, 3, surfaces.sand)
+    other = models.Footprint([Coordinate(0, 0), Coordinate(1, 1)])
+    assert np.array_equal(field.fit_mask(other), brute_fit(field, other))
+    assert np.array_equal(field.fit_mask(footprint), brute_fit(field, footprint))
@@ -0,0 +1,73 @@
+import glob
+import os
+from collections import deque
+from typing import List, Optional
+
+import pytest
+
+import models
+import pathfinding
+from core import Coordinate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAPS = sorted(glob.glob(os.path.join(ROOT, 'maps', 'test*.txt')))
+
+
+def load(path: str) -> models.Field:
+    field = models.Field(1, 1)
+    with open(path) as fi:
+        field.load(fi)
+    return field
+
+
+def lee(field: models.Field, start: Coordinate) -> List[List[Optional[int]]]:
+    # волновой алгоритм Ли, которым маршруты строились до A*: длина кратчайшего маршрута
+    # до каждой клетки; конечная клетка может быть непроходимой, если до соседней можно дойти
+    passability = field.passability
+    reached = [[None] * field.width for _ in range(field.height)]
+    reached[start.y][start.x] = 0
+    wave = deque([start])
+    while wave:
+        position = wave.popleft()
+        for _, dx, dy in pathfinding.STEPS:
+            x, y = position.x + dx, position.y + dy
+            if 0 <= x < field.width and 0 <= y < field.height and reached[y][x] is None \
+                    and passability.item(y, x):
+                reached[y][x] = reached[position.y][position.x] + 1
+                wave.append(Coordinate(x, y))
+
+    result = [[None] * field.width for _ in range(field.height)]
+    for y in range(field.height):
+        for x in range(field.width):
+            lengths = [reached[y + dy][x + dx] + 1 for _, dx, dy in pathfinding.STEPS
+                       if 0 <= x + dx < field.width and 0 <= y + dy < field.height
+                       and reached[y + dy][x + dx] is not None]
+            result[y][x] = min(lengths) if lengths else None
+    return result
+
+
+@pytest.mark.parametrize('path', MAPS, ids=os.path.basename)
+def test_route_lengths_match_lee(path):
+    field = load(path)
+    passability = field.passability
+
+    def passable(x: int, y: int) -> bool:
+        return passability.item(y, x)
+
+    for start in (Coordinate(x, y) for y in range(field.height) for x in range(field.width)):
+        if not passable(start.x, start.y):
+            continue
+
+        expected = lee(field, start)
+        for y in range(field.height):
+            for x in range(field.width):
+                finish = Coordinate(x, y)
+                if finish.equals(start):
+                    continue
+
+                route = pathfinding.find_path(start, finish, field.width, field.height, passable)
+                assert (None if route is None else len(route)) == expected[y][x], (start, finish)
+
+
+def test_maps_found():
+    assert MAPS
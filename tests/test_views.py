@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+
+from PySide2.QtCore import QEvent, QPointF, Qt
+from PySide2.QtWidgets import QGraphicsSceneMouseEvent
+
+import config
+import graphics
+import models
+import surfaces
+import views
+from core import Coordinate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZE = 32
+RESOURCE = 'red17'
+
+
+@pytest.fixture
+def scene(application, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'SPRITES_PATH', os.path.join(ROOT, 'resource', 'sprites'))
+    monkeypatch.setattr(config, 'OVERLAYS_PATH', os.path.join(ROOT, 'resource', 'overlays'))
+    monkeypatch.setattr(config, 'RASTER_CACHE_PATH', str(tmp_path))
+    graphics.sprite_sheets.clear()
+
+    field = models.Field(1, 1)
+    field.assign(np.full((40, 40), surfaces.code_of(surfaces.sand), dtype=np.uint8), list(surfaces.PALETTE))
+    return views.Field(field, None, SIZE, virtualized=True)
+
+
+def add_units(scene: views.Field, *cells) -> list:
+    units = []
+    for x, y in cells:
+        unit = views.Unit(models.Unit(RESOURCE, scene.model, Coordinate(x, y)), RESOURCE, None, SIZE)
+        scene.add_unit(unit)
+        units.append(unit)
+    return units
+
+
+def release(scene: views.Field, button, pressed: QPointF, released: QPointF):
+    event = QGraphicsSceneMouseEvent(QEvent.GraphicsSceneMouseRelease)
+    event.setButton(button)
+    event.setButtonDownScenePos(button, pressed)
+    event.setButtonDownScreenPos(button, pressed.toPoint())
+    event.setScenePos(released)
+    event.setScreenPos(released.toPoint())
+    scene.mouseReleaseEvent(event)
+
+
+def center(x: int, y: int) -> QPointF:
+    return QPointF((x + 0.5) * SIZE, (y + 0.5) * SIZE)
+
+
+def test_rubber_band_selects_units_in_area(scene):
+    inside = add_units(scene, (2, 2), (5, 3), (17, 17))
+    outside = add_units(scene, (18, 17), (1, 30))
+    selected = []
+    scene.units_selected.connect(selected.append)
+
+    release(scene, Qt.LeftButton, center(2, 2), center(17, 17) - QPointF(SIZE / 4, 0))
+    assert set(selected[-1]) == set(inside)
+    assert all(unit.selected for unit in inside)
+    assert not any(unit.selected for unit in outside)
+
+
+def test_click_selects_unit_or_activates_cell(scene):
+    unit, = add_units(scene, (3, 4))
+    activated = []
+    scene.cell_activated.connect(activated.append)
+
+    release(scene, Qt.LeftButton, center(3, 4), center(3, 4))
+    assert unit.selected and not activated
+
+    release(scene, Qt.LeftButton, center(6, 4), center(6, 4))
+    assert (activated[-1].x, activated[-1].y) == (6, 4)
+
+
+def test_right_click_clears_selection(scene):
+    units = add_units(scene, (1, 1), (2, 1))
+    cleared = []
+    scene.selection_cleared.connect(lambda: cleared.append(True))
+
+    scene.select_units(units)
+    release(scene, Qt.RightButton, QPointF(), QPointF())
+    assert cleared == [True]
+    assert not any(unit.selected for unit in units)
+
+    # пустое выделение не сбрасывается повторно
+    release(scene, Qt.RightButton, QPointF(), QPointF())
+    assert cleared == [True]
+
+
+def test_empty_area_selects_nothing(scene):
+    add_units(scene, (30, 30))
+    selected = []
+    scene.units_selected.connect(selected.append)
+
+    release(scene, Qt.LeftButton, center(0, 0), center(10, 10))
+    assert not selected
+    assert scene.units_in_area(scene.sceneRect()) != []
+
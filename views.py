@@ -1,37 +1,40 @@
 import math
-from typing import Optional, Iterable, List
+from typing import Optional, Iterable, List, Dict, Tuple
 
-from PySide2.QtCore import QObject, QRectF, QPointF, QPropertyAnimation, Qt, Signal, QByteArray
-from PySide2.QtGui import QPainter, QPixmap, QBrush, QTransform, QPainterPath
-from PySide2.QtWidgets import QGraphicsItem, QGraphicsSceneHoverEvent, \
-    QStyleOptionGraphicsItem, QWidget, QGraphicsScene, QGraphicsSceneMouseEvent
+from PySide2.QtCore import QObject, QRect, QRectF, QPointF, QPropertyAnimation, Qt, Signal, QByteArray
+from PySide2.QtGui import QPainter, QBrush, QPainterPath, QPixmapCache
+from PySide2.QtWidgets import QGraphicsItem, QGraphicsPathItem, \
+    QStyleOptionGraphicsItem, QWidget, QGraphicsScene, QGraphicsSceneMouseEvent, QApplication
 
 import config
+import graphics
 import models
 import overlays
+import surfaces
 import resources as rc
-from core import Directions, UnitState, AutoDisconnector, Coordinate, Event
-from graphics import Tile, AnimatedSprite
+import simulation
+from core import Directions, UnitState, Coordinate
+from graphics import AnimatedSprite
 
+TERRAIN_Z_VALUE = -2
+CURSOR_Z_VALUE = -1
+ROUTE_Z_VALUE = 1
 
-class Unit(AnimatedSprite):
-    animation_ended = None
 
+class Unit(AnimatedSprite):
     def __init__(self, model: models.Unit, resource: str, controller, size, parent: Optional[QGraphicsItem] = None):
         super().__init__(parent)
-        self.setFlag(Unit.ItemIsSelectable)
-
         self.model = model
         self.controller = controller
-        self.animation_ended = Event()
 
-        self.model.path_completed.subscribe(self._stand)
-        self.model.turned.subscribe(self._turn)
-        self.model.moved.subscribe(self._move)
+        # модель не должна удерживать вид, переживший свою сцену
+        self.model.path_completed.subscribe(self._stand, weak=True)
+        self.model.turned.subscribe(self._turn, weak=True)
+        self.model.moved.subscribe(self._move, weak=True)
 
         self.overlays = overlays.Map()
         self._sprite_size = size
-        self._path_list: Optional[List[QPainterPath]] = []
+        self._route: Optional[RoutePath] = None
         self._selected = False
         self._resource = resource
 
@@ -52,7 +55,7 @@ class Unit(AnimatedSprite):
         return self._selected
 
     def select(self):
-        self.model.route_calculated.subscribe(self.draw_path)
+        self.model.route_calculated.subscribe(self.draw_path, weak=True)
 
         size = self.boundingRect().size()
         overlay = overlays.Pixmap(overlays.Names.cursor_selected, size, overlays.PaintOrder.prev)
@@ -67,16 +70,18 @@ class Unit(AnimatedSprite):
             self.clear_path()
 
     def draw_path(self, start: Coordinate, finish: Coordinate, route: Iterable[Directions]):
-        self.clear_path()
         path = self._get_graphic_path(start, finish, route)
-        self._path_list.append(path)
-        self.scene().add_unit_path(path)
+        if self._route is None:
+            self._route = RoutePath(path)
+            self.scene().add_unit_path(self._route)
+        else:
+            # перерисуются только старая и новая области маршрута
+            self._route.setPath(path)
 
     def clear_path(self):
-        for path in self._path_list:
-            self.scene().remove_unit_path(path)
-
-        self._path_list = []
+        if self._route is not None:
+            self.scene().remove_unit_path(self._route)
+            self._route = None
 
     def _get_graphic_path(self, start: Coordinate, finish: Coordinate, route: Iterable[Directions]) -> QPainterPath:
         def generate_half_size_rect(point):
@@ -110,126 +115,266 @@ class Unit(AnimatedSprite):
         super().paint(painter, option, widget)
         self.overlays.draw(painter, overlays.PaintOrder.post)
 
+    # шаги и повороты отсчитывает simulation, вид только плавно догоняет модель
     def _move(self, direction: Directions):
         moving = QPropertyAnimation(self, QByteArray(bytes('pos', 'utf-8')), self)
-        moving.setDuration(math.ceil(config.DEFAULT_MOVE_ANIMATION_SPEED / self.model.speed.value))
+        moving.setDuration(simulation.move_duration(self.model))
         moving.setStartValue(self.pos())
         moving.setEndValue(QPointF(self.model.x * self._sprite_size, self.model.y * self._sprite_size))
-        moving.finished.connect(self.animation_ended.notify)
 
         moving.start(QPropertyAnimation.DeleteWhenStopped)
         self.animations.switch((UnitState.move, None, direction))
 
     def _turn(self, old: Directions, new: Directions):
-        animation = self.animations.switch((UnitState.turn, old, new))
-        AutoDisconnector(animation.finished, self.animation_ended.notify, self)
+        self.animations.switch((UnitState.turn, old, new))
 
     def _stand(self):
         self.animations.switch((UnitState.stand, None, self.model.direction))
         self.clear_path()
 
 
-class Cell(Tile):
-    def __init__(self, model: models.Cell, size: int, parent: Optional[QGraphicsItem] = None):
-        filename = config.SURFACE_NAME_TEMPLATE.format(model.surface.resource, model.surface.id)
-        tile = QPixmap(rc.get_tile(filename)).scaledToHeight(size, mode=Qt.SmoothTransformation)
-        super().__init__(tile, size, parent)
+class RoutePath(QGraphicsPathItem):
+    def __init__(self, path: QPainterPath, parent: Optional[QGraphicsItem] = None):
+        super().__init__(path, parent)
+        # boundingRect охватывает только сам маршрут с толщиной пера
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.setZValue(ROUTE_Z_VALUE)
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setPen(rc.PATH_PEN)
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = None):
+        painter.setRenderHint(painter.Antialiasing)
+        super().paint(painter, option, widget)
+
+
+class TerrainChunk(QGraphicsItem):
+    def __init__(self, model: models.Field, left: int, top: int, cells: int, size: int,
+                 parent: Optional[QGraphicsItem] = None):
+        super().__init__(parent)
+        # блок клеток рисуется один раз и дальше берётся из кэша Qt
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self.setZValue(TERRAIN_Z_VALUE)
 
-        self.setAcceptHoverEvents(True)
-        self.overlays = overlays.Map()
         self.model = model
+        self._cells = cells
+        self._size = size
+        self._left = self._top = self._width = self._height = 0
+
+        self.assign(left, top)
+
+    def assign(self, left: int, top: int):
+        # блок переиспользуется для другого участка карты
+        self.prepareGeometryChange()
+        self._left = left
+        self._top = top
+        self._width = min(self._cells, self.model.width - left)
+        self._height = min(self._cells, self.model.height - top)
+
+        self.setPos(left * self._size, top * self._size)
+        self.update()
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self._width * self._size, self._height * self._size)
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = None):
+        painter.setRenderHint(painter.SmoothPixmapTransform)
+        codes = self.model.surface_codes[self._top:self._top + self._height, self._left:self._left + self._width]
+        tile_size = max(1, round(self._size * graphics.painter_level_of_detail(painter)))
+
+        pixmaps = {}
+        for y, row in enumerate(codes.tolist()):
+            for x, code in enumerate(row):
+                if (pixmap := pixmaps.get(code)) is None:
+                    surface = surfaces.by_code(code)
+                    pixmap = pixmaps[code] = graphics.tiles.get(surface.resource, surface.id, tile_size)
 
-    def hoverEnterEvent(self, event: QGraphicsSceneHoverEvent):
-        color = rc.PASSABLE_CURSOR_COLOR if self.model.passable else rc.IMPASSABLE_CURSOR_COLOR
-        self.overlays.add(overlays.Backlight(color, self.boundingRect(), overlays.PaintOrder.post))
-        super().hoverEnterEvent(event)
+                painter.drawPixmap(QRect(x * self._size, y * self._size, self._size, self._size), pixmap)
 
-    def hoverLeaveEvent(self, event: QGraphicsSceneHoverEvent):
+    def __repr__(self) -> str:
+        return f'views.TerrainChunk({self._left}, {self._top})'
+
+
+class CellCursor(QGraphicsItem):
+    def __init__(self, size: int, parent: Optional[QGraphicsItem] = None):
+        super().__init__(parent)
+        self.setZValue(CURSOR_Z_VALUE)
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.overlays = overlays.Map()
+        self._cell: Optional[models.Cell] = None
+        self._size = size
+        self.hide()
+
+    @property
+    def cell(self) -> Optional[models.Cell]:
+        return self._cell
+
+    def point(self, cell: Optional[models.Cell]):
+        if cell == self._cell:
+            return
+
+        self._cell = cell
         self.overlays.remove_by_type(overlays.Backlight)
-        super().hoverEnterEvent(event)
+        if cell:
+            color = rc.PASSABLE_CURSOR_COLOR if cell.passable else rc.IMPASSABLE_CURSOR_COLOR
+            self.overlays.add(overlays.Backlight(color, self.boundingRect(), overlays.PaintOrder.post))
+            self.setPos(cell.x * self._size, cell.y * self._size)
+            self.show()
+        else:
+            self.hide()
+
+    def boundingRect(self) -> QRectF:
+        return QRectF(0, 0, self._size, self._size)
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = None):
         self.overlays.draw(painter, overlays.PaintOrder.prev)
-        super().paint(painter, option, widget)
         self.overlays.draw(painter, overlays.PaintOrder.post)
 
-    def __repr__(self) -> str:
-        return f'views.Cell({self.model.surface.name})'
-
 
 class Field(QGraphicsScene):
-    cell_activated = Signal(Cell)
+    cell_activated = Signal(object)  # models.Cell
     units_selected = Signal(list)
     selection_cleared = Signal()
 
-    def __init__(self, model: models.Field, controller, elements_size: int, parent: Optional[QObject] = None):
+    def __init__(self, model: models.Field, controller, elements_size: int,
+                 virtualized: bool = False, parent: Optional[QObject] = None):
         super().__init__(parent)
         self.setBackgroundBrush(QBrush(rc.FIELD_BACKGROUND_COLOR))
+        # запечённые блоки ландшафта хранятся в QPixmapCache
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), config.TERRAIN_CACHE_LIMIT))
 
-        self._units_path: List[QPainterPath] = []
         self._elements_size = elements_size
         self.controller = controller
         self.model = model
 
-        self._load_cells()
+        # выделение ведётся сценой, а не флагом ItemIsSelectable, чтобы не обходить все элементы
+        self._units: Dict[models.Unit, Unit] = {}
+        self._selected_units: List[Unit] = []
+        self._chunks: Dict[Tuple[int, int], TerrainChunk] = {}
+        self._spare_chunks: List[TerrainChunk] = []
+        self._virtualized = virtualized
+        self._cursor = CellCursor(elements_size)
+        self.addItem(self._cursor)
+
+        self.setSceneRect(0, 0, model.width * elements_size, model.height * elements_size)
+        self.model.changed.subscribe(self._apply_changes, weak=True)
+        if not virtualized:
+            self._load_cells()
 
     @property
     def elements_size(self):
         return self._elements_size
 
     def add_unit(self, unit: Unit):
+        self._units[unit.model] = unit
         self.addItem(unit)
 
-    def add_unit_path(self, path: QPainterPath):
-        self._units_path.append(path)
+    def units_in_area(self, rect: QRectF) -> List[Unit]:
+        size = self._elements_size
+        models_ = self.model.unit_index.in_region(math.floor(rect.left() / size), math.floor(rect.top() / size),
+                                                  math.floor(rect.right() / size), math.floor(rect.bottom() / size))
+        return [self._units[unit] for unit in models_ if unit in self._units]
 
-    def remove_unit_path(self, path: QPainterPath):
-        index = self._units_path.index(path)
-        del self._units_path[index]
+    def select_units(self, units: List[Unit]):
+        self.remove_selection()
+        for unit in units:
+            unit.select()
 
-    def drawForeground(self, painter: QPainter, rect: QRectF):
-        painter.setRenderHint(painter.Antialiasing)
-        painter.setPen(rc.PATH_PEN)
+        self._selected_units = units
+        if units:
+            self.units_selected.emit(units)
 
-        for path in self._units_path:
-            painter.drawPath(path)
+    def add_unit_path(self, path: RoutePath):
+        self.addItem(path)
 
-        super().drawForeground(painter, rect)
+    def remove_unit_path(self, path: RoutePath):
+        self.removeItem(path)
+
+    @property
+    def virtualized(self) -> bool:
+        return self._virtualized
+
+    def set_visible_rect(self, rect: QRectF):
+        # в виртуальном режиме на сцене есть только блоки видимой области и поля вокруг неё
+        if not self._virtualized:
+            return
+
+        cells = config.TERRAIN_CHUNK_CELLS
+        chunk_size = cells * self._elements_size
+        margin = config.VIEWPORT_MARGIN_CHUNKS
+        columns = math.ceil(self.model.width / cells)
+        rows = math.ceil(self.model.height / cells)
+
+        left = max(0, math.floor(rect.left() / chunk_size) - margin)
+        top = max(0, math.floor(rect.top() / chunk_size) - margin)
+        right = min(columns, math.floor(rect.right() / chunk_size) + margin + 1)
+        bottom = min(rows, math.floor(rect.bottom() / chunk_size) + margin + 1)
+
+        visible = {(column, row) for row in range(top, bottom) for column in range(left, right)}
+        for key in [key for key in self._chunks if key not in visible]:
+            chunk = self._chunks.pop(key)
+            chunk.hide()
+            self._spare_chunks.append(chunk)
+
+        for column, row in visible.difference(self._chunks):
+            if self._spare_chunks:
+                chunk = self._spare_chunks.pop()
+                chunk.assign(column * cells, row * cells)
+                chunk.show()
+            else:
+                chunk = TerrainChunk(self.model, column * cells, row * cells, cells, self._elements_size)
+                self.addItem(chunk)
+            self._chunks[(column, row)] = chunk
+
+        while len(self._spare_chunks) > len(self._chunks):
+            self.removeItem(self._spare_chunks.pop())
+
+    def cell_at(self, point: QPointF) -> Optional[models.Cell]:
+        x, y = math.floor(point.x() / self._elements_size), math.floor(point.y() / self._elements_size)
+        return self.model.at(x, y)
 
     def mouseReleaseEvent(self, event: QGraphicsSceneMouseEvent):
         if event.button() == Qt.LeftButton:
-            if units := self.selectedItems():
-
-                self.remove_selection()
-                for unit in units:
-                    unit.select()
+            pressed = event.buttonDownScenePos(Qt.LeftButton)
+            dragged = (event.buttonDownScreenPos(Qt.LeftButton) - event.screenPos()).manhattanLength()
 
-                self.units_selected.emit(units)
+            if dragged >= QApplication.startDragDistance():
+                # рамка выделения
+                self.select_units(self.units_in_area(QRectF(pressed, event.scenePos()).normalized()))
 
-            elif item := self.itemAt(event.scenePos(), QTransform()):
-                if isinstance(item, Cell):
-                    self.cell_activated.emit(item)
+            elif cell := self.cell_at(event.scenePos()):
+                unit = self.model.units.get(cell.x, cell.y)
+                if unit in self._units:
+                    self.select_units([self._units[unit]])
+                else:
+                    self.cell_activated.emit(cell)
 
         elif event.button() == Qt.RightButton:
             self.remove_selection()
 
         super().mouseReleaseEvent(event)
 
+    def mouseMoveEvent(self, event: QGraphicsSceneMouseEvent):
+        self._cursor.point(self.cell_at(event.scenePos()))
+        super().mouseMoveEvent(event)
+
     def remove_selection(self):
-        cleared = False
-        for item in self.items():
-            if isinstance(item, Unit):
-                if item.selected:
-                    item.clear_selection()
-                    cleared = True
-        if cleared:
+        if self._selected_units:
+            for unit in self._selected_units:
+                unit.clear_selection()
+            self._selected_units = []
             self.selection_cleared.emit()
 
     def _load_cells(self):
-        for y in range(self.model.height):
-            for x in range(self.model.width):
-                cell_model = self.model.at(x, y)
-                cell_view = Cell(cell_model, self._elements_size)
-
-                self.addItem(cell_view)
-                cell_view.setPos(cell_view.element_size * x, cell_view.element_size * y)
+        cells = config.TERRAIN_CHUNK_CELLS
+        for top in range(0, self.model.height, cells):
+            for left in range(0, self.model.width, cells):
+                chunk = TerrainChunk(self.model, left, top, cells, self._elements_size)
+                self._chunks[(left // cells, top // cells)] = chunk
+                self.addItem(chunk)
+
+    def _apply_changes(self, diff: models.FieldDiff):
+        # каждый затронутый блок ландшафта перерисовывается один раз за пакет изменений
+        cells = config.TERRAIN_CHUNK_CELLS
+        for key in {(x // cells, y // cells) for x, y in diff.surfaces}:
+            if chunk := self._chunks.get(key):
+                chunk.update()